@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,6 +27,10 @@ SECRET_KEY = 'django-insecure-j9k^h4=*7#c7qorku+nimewied#wrazq+1br0b%mgzx9lo2nb9
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Swaps shared services (caches) for in-process ones. Set automatically by
+# `manage.py test`; other runners (pytest, IDEs) must export DJANGO_TESTING=1.
+TESTING = sys.argv[1:2] == ['test'] or os.environ.get('DJANGO_TESTING') == '1'
+
 ALLOWED_HOSTS = []
 
 
@@ -47,11 +53,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.audit.CurrentUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
@@ -62,7 +70,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,9 +93,40 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the in-memory default, so tests get the same
+        # locking (WAL, busy_timeout) as a deployed database.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Read-only reports and exports can be served from a replica (core.db.ReplicaRouter).
+# Locally, set DATABASE_REPLICA_NAME to a second SQLite file and refresh it with
+# `manage.py sync_sqlite_replica`; tests read the replica through the primary.
+DATABASE_REPLICA_ALIAS = 'replica'
+if os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+# Keep connections open between requests and check them before reuse, so the
+# per-connection setup (TLS, auth, SQLite PRAGMAs) isn't paid on every request.
+# config/asgi.py defaults DATABASE_CONN_MAX_AGE to 0: there each request's ORM
+# calls run in a thread of their own, so a kept connection is never reused.
+for _database in DATABASES.values():
+    _database.setdefault('CONN_MAX_AGE', int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)))
+    _database.setdefault('CONN_HEALTH_CHECKS', True)
+
+# Applied to every new SQLite connection (core.db.apply_sqlite_pragmas).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,3 +189,119 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 LOGIN_REDIRECT_URL = '/apply/'  
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Generated PDF exports (see core.exports); rendered in chunks of this many rows
+EXPORT_ROOT = BASE_DIR / 'exports'
+EXPORT_PDF_CHUNK_SIZE = 500
+EXPORT_ITERATOR_CHUNK_SIZE = 2000
+
+# Device check-ins (core.checkins): events are buffered and flushed in batches
+CHECKIN_QUEUE_ENABLED = True
+CHECKIN_FLUSH_MAX_EVENTS = 5000
+CHECKIN_FLUSH_INTERVAL = 0.05  # seconds
+CHECKIN_RESULT_TIMEOUT = 10  # seconds
+
+# Synced into django_celery_beat's DatabaseScheduler when beat starts
+CELERY_BEAT_SCHEDULE = {
+    'backfill-absent-attendance': {
+        'task': 'core.tasks.backfill_absent_attendance',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    'rebuild-attendance-summaries': {
+        'task': 'core.tasks.rebuild_attendance_summaries',
+        'schedule': crontab(hour=1, minute=0),
+    },
+    'archive-old-leave-logs': {
+        'task': 'core.tasks.archive_old_leave_logs',
+        'schedule': crontab(hour=2, minute=0, day_of_month=1),
+    },
+    'accrue-leave-balances': {
+        'task': 'core.tasks.accrue_leave_balances',
+        'schedule': crontab(hour=0, minute=30, day_of_month=1),
+    },
+    'drain-leave-notifications': {
+        'task': 'core.tasks.drain_leave_notifications',
+        'schedule': crontab(minute='*'),
+    },
+}
+
+ATTENDANCE_SUMMARY_PAGE_SIZE = 100
+LEAVE_LIST_PAGE_SIZE = 50
+LEAVE_LOG_PAGE_SIZE = 100
+LEAVE_LOG_RETENTION_MONTHS = 12
+LEAVE_LOG_ARCHIVE_DIR = BASE_DIR / 'archive' / 'leave_logs'
+
+# Caches: "default" holds shared lookups such as the holiday calendar and must
+# be shared by every web and Celery worker, so it lives in Redis next to the
+# broker (tests use a LocMemCache). The "dashboard" alias holds per-user
+# history fragments (core.dashboard_cache) whose version keys are bumped by
+# Celery tasks and other workers, so it has to be shared too: Redis by default,
+# or DASHBOARD_CACHE=db (needs `createcachetable`). "file" is only shared by
+# processes on one host, "locmem" only within one process (tests).
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/1')
+DASHBOARD_CACHE_BACKENDS = {
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': 'dashboard',
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'dashboard',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'dashboard_cache',
+    },
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+    },
+    'dashboard': DASHBOARD_CACHE_BACKENDS[os.environ.get('DASHBOARD_CACHE', 'redis')],
+}
+if TESTING:
+    CACHES['default'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    CACHES['dashboard'] = DASHBOARD_CACHE_BACKENDS['locmem']
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+HOLIDAY_CALENDAR_TIMEOUT = 60 * 60 * 24
+
+# Email delivery (core.mailer): recipients per SMTP connection / subtask, and
+# retry policy for batches that hit connection errors.
+EMAIL_BATCH_SIZE = 100
+EMAIL_DELIVERY_MAX_RETRIES = 5
+EMAIL_RETRY_BACKOFF = 30
+
+# Leave decision notifications (core.notifications): outbox events drained per run
+NOTIFICATION_DRAIN_LIMIT = 5000
+
+# Monthly leave accrual (core.accrual): users per checkpointed transaction
+ACCRUAL_CHUNK_SIZE = 5000
+ACCRUAL_INSERT_BATCH_SIZE = 10000
+
+# Attendance analytics (core.analytics): marks after this local time count as late
+ATTENDANCE_LATE_AFTER = '09:30'
+
+# End-of-day absence backfill (core.absences): users per lookup + INSERT
+ABSENCE_BACKFILL_BATCH_SIZE = 5000
+
+# Request profiling (core.profiling): per-view histograms served on /metrics to
+# staff, or to scrapers sending "Authorization: Bearer $METRICS_TOKEN".
+PROFILING_DUPLICATE_QUERY_THRESHOLD = 5
+PROFILING_CPROFILE_SAMPLE_RATE = float(os.environ.get('PROFILING_CPROFILE_SAMPLE_RATE', 0))
+PROFILING_CPROFILE_DIR = BASE_DIR / 'profiles'
+PROFILING_CPROFILE_KEEP = 20
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Live attendance dashboard (core.live): events buffered per open stream before
+# it is sent a fresh snapshot instead, check-ins named per event, and how often
+# an idle stream re-reads the counts (also the WSGI fallback's poll interval).
+LIVE_DASHBOARD_QUEUE_SIZE = 100
+LIVE_DASHBOARD_MAX_NAMES = 20
+LIVE_DASHBOARD_RESYNC_SECONDS = 30
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .dashboard_cache import bump_versions
+from .db import insert_rows
+from .models import Attendance, LeaveRequest
+from .workdays import working_days_between
+
+BackfillResult = namedtuple('BackfillResult', 'absent on_leave')
+
+
+def backfill_absences(day, batch_size=None):
+    # Writes an ABSENT row (ON_LEAVE if an approved leave covers the day) for
+    # every active employee left unmarked on a working day, so history pages and
+    # reports read stored rows instead of diffing against the users table.
+    # Users are walked in pk order, one lookup and one bulk INSERT per batch;
+    # only missing rows are written, so re-running a day is harmless.
+    if not working_days_between(day, day):
+        return BackfillResult([], [])
+
+    batch_size = batch_size or settings.ABSENCE_BACKFILL_BATCH_SIZE
+    on_leave = set(
+        LeaveRequest.objects.filter(status='APPROVED').overlapping(day, day)
+        .values_list('employee_id', flat=True)
+    )
+    users = (
+        User.objects.filter(is_active=True, date_joined__date__lte=day)
+        .annotate(marked=Exists(Attendance.objects.filter(user=OuterRef('pk'), date=day)))
+        .order_by('pk')
+    )
+
+    day_value = connection.ops.adapt_datefield_value(day)
+    absent, away = [], []
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk).values_list('pk', 'marked')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        unmarked = [pk for pk, marked in batch if not marked]
+        if not unmarked:
+            continue
+        marked_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        # Someone who checks in between the lookup and the insert keeps their row.
+        insert_rows(Attendance, ('user', 'date', 'status', 'marked_at'), [
+            (pk, day_value, 'ON_LEAVE' if pk in on_leave else 'ABSENT', marked_at) for pk in unmarked
+        ], ignore_conflicts=True)
+        # Nothing to move in the daily rollup: anyone not present is already in its absent set.
+        bump_versions('attendance_history', unmarked)
+        for pk in unmarked:
+            (away if pk in on_leave else absent).append(pk)
+    return BackfillResult(absent, away)
+
@@ -1,52 +1,33 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.http import HttpResponse
 from django.template.loader import render_to_string
 from weasyprint import HTML
 import io
-from django.db.models import F
 
-from .models import LeaveRequest, Holiday, LeaveLog, Attendance, LeaveType,LeaveBalance
+from .models import LeaveRequest, Holiday, LeaveLog, Attendance, LeaveType, LeaveBalance, ExportJob, DeviceToken, EmailDelivery, NotificationEvent, LeaveLedgerEntry, AccrualRun
+from .exports import stream_csv, stream_xlsx
+from .services import decide_leaves
+from .ledger import grant_leave
+from .tasks import dispatch_deliveries
 
 # --------------------- Custom Admin Actions ---------------------
 
 @admin.action(description='Approve selected leave requests')
 def approve_leaves(modeladmin, request, queryset):
-    for leave in queryset:
-        if leave.status != 'APPROVED':
-            # 👇 Optional: reduce leave balance
-            try:
-                LeaveBalance.objects.filter(
-                    user=leave.employee,
-                    leave_type=leave.leave_type
-                ).update(
-                    remaining=F('remaining') - (leave.end_date - leave.start_date).days + 1
-                )
-            except LeaveBalance.DoesNotExist:
-                pass  # or handle it if needed
-
-            # 👇 Log and approve
-            LeaveLog.objects.create(
-                leave=leave,
-                changed_by=request.user,
-                previous_status=leave.status,
-                new_status='APPROVED'
-            )
-            leave.status = 'APPROVED'
-            leave.save()
+    decided, insufficient = decide_leaves(queryset, 'APPROVED', request.user)
+    modeladmin.message_user(request, f"{decided} leave request(s) approved.")
+    if insufficient:
+        modeladmin.message_user(
+            request, f"{len(insufficient)} leave request(s) left pending: insufficient balance.", messages.WARNING
+        )
 
 # ✅ Reject action
 @admin.action(description='Reject selected leave requests')
 def reject_leaves(modeladmin, request, queryset):
-    for leave in queryset:
-        if leave.status != 'REJECTED':
-            LeaveLog.objects.create(
-                leave=leave,
-                changed_by=request.user,
-                previous_status=leave.status,
-                new_status='REJECTED'
-            )
-            leave.status = 'REJECTED'
-            leave.save()
+    decided, _ = decide_leaves(queryset, 'REJECTED', request.user)
+    modeladmin.message_user(request, f"{decided} leave request(s) rejected.")
+
 @admin.action(description='Export selected leave requests to PDF')
 def export_selected_to_pdf(modeladmin, request, queryset):
     html_string = render_to_string('core/admin_export_pdf.html', {'queryset': queryset})
@@ -62,6 +43,19 @@ def export_selected_to_pdf(modeladmin, request, queryset):
     response['Content-Disposition'] = 'attachment; filename="leave_requests.pdf"'
     return response
 
+def _dataset_for(modeladmin):
+    return 'attendance' if modeladmin.model is Attendance else 'leave'
+
+@admin.action(description='Export selected rows to CSV')
+def export_selected_to_csv(modeladmin, request, queryset):
+    dataset = _dataset_for(modeladmin)
+    return stream_csv(dataset, queryset, f"{dataset}_export")
+
+@admin.action(description='Export selected rows to Excel')
+def export_selected_to_xlsx(modeladmin, request, queryset):
+    dataset = _dataset_for(modeladmin)
+    return stream_xlsx(dataset, queryset, f"{dataset}_export")
+
 
 # --------------------- Admin Models ---------------------
 
@@ -69,11 +63,15 @@ def export_selected_to_pdf(modeladmin, request, queryset):
 class LeaveAdmin(admin.ModelAdmin):
     list_display = ('employee', 'start_date', 'end_date', 'status')
     list_filter = ('status', 'start_date', 'end_date')
-    actions = [approve_leaves, reject_leaves, export_selected_to_pdf]
+    # Decisions go through the approve/reject actions, which keep the ledger,
+    # audit log and notifications in step; the form can't change the status.
+    readonly_fields = ('status',)
+    actions = [approve_leaves, reject_leaves, export_selected_to_pdf, export_selected_to_csv, export_selected_to_xlsx]
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'status')
+    actions = [export_selected_to_csv, export_selected_to_xlsx]
 
 @admin.register(Holiday)
 class HolidayAdmin(admin.ModelAdmin):
@@ -87,3 +85,86 @@ class LeaveLogAdmin(admin.ModelAdmin):
 @admin.register(LeaveType)
 class LeaveTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'annual_limit')
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'leave_type', 'remaining')
+    list_filter = ('leave_type',)
+    search_fields = ('user__username',)
+    readonly_fields = ('remaining',)  # maintained from the ledger
+
+    def has_add_permission(self, request):
+        # Balances are opened by the first grant for a user and leave type.
+        return False
+
+class LeaveLedgerEntryForm(forms.ModelForm):
+    class Meta:
+        model = LeaveLedgerEntry
+        fields = ('user', 'leave_type', 'days', 'note')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        user, leave_type, days = (cleaned_data.get(field) for field in ('user', 'leave_type', 'days'))
+        if user and leave_type and days is not None and days < 0:
+            # The admin saves in the same transaction, so the lock holds until the grant is written.
+            balance = LeaveBalance.objects.select_for_update().filter(user=user, leave_type=leave_type).first()
+            remaining = balance.remaining if balance else 0
+            if remaining + days < 0:
+                raise forms.ValidationError(
+                    f"{user} has only {remaining} day(s) of {leave_type} left; can't take away {-days}."
+                )
+        return cleaned_data
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    # Append-only: entries are added as grants and never edited or removed.
+    form = LeaveLedgerEntryForm
+    list_display = ('user', 'leave_type', 'kind', 'days', 'leave', 'created_by', 'created_at')
+    list_filter = ('kind', 'leave_type')
+    search_fields = ('user__username',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        entry = grant_leave(obj.user, obj.leave_type, obj.days, note=obj.note, created_by=request.user)
+        obj.pk, obj.kind = entry.pk, entry.kind
+
+@admin.register(AccrualRun)
+class AccrualRunAdmin(admin.ModelAdmin):
+    list_display = ('period', 'status', 'users', 'started_at', 'finished_at')
+    readonly_fields = ('last_user_id', 'users', 'started_at', 'finished_at')
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'requested_by', 'status', 'rows', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+
+@admin.register(DeviceToken)
+class DeviceTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_active', 'created_at')
+    readonly_fields = ('key',)
+
+
+@admin.register(EmailDelivery)
+class EmailDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'email', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('email',)
+    actions = ['retry_deliveries']
+
+    @admin.action(description="Retry selected deliveries")
+    def retry_deliveries(self, request, queryset):
+        ids = list(queryset.exclude(status='SENT').values_list('pk', flat=True))
+        EmailDelivery.objects.filter(pk__in=ids).update(status='PENDING', error='')
+        dispatch_deliveries(ids)
+        self.message_user(request, f"{len(ids)} deliveries queued again.")
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'leave', 'previous_status', 'new_status', 'created_at', 'processed_at')
+    list_filter = ('new_status',)
+    raw_id_fields = ('leave', 'delivery')
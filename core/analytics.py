@@ -0,0 +1,217 @@
+import io
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, models
+from django.db.models.functions import Cast
+
+from .holidays import get_holiday_calendar
+from .models import Attendance, LeaveRequest
+
+UNASSIGNED = 'Unassigned'
+
+
+def fetch_frame(queryset, columns):
+    # Runs the ORM-compiled SQL on a plain cursor and builds the frame column by
+    # column. Dates are selected as text: the driver's per-value date parsing
+    # (and model instances) would otherwise dominate a multi-million-row pull,
+    # while NumPy and pandas parse a whole column of ISO strings at once.
+    kinds = {}
+    selected = []
+    for column in columns:
+        field = queryset.model._meta.get_field(column) if '__' not in column else None
+        if isinstance(field, (models.DateField, models.DateTimeField)):
+            kinds[column] = 'datetime' if isinstance(field, models.DateTimeField) else 'date'
+            queryset = queryset.annotate(**{f'{column}_text': Cast(column, models.CharField())})
+            selected.append(f'{column}_text')
+        else:
+            selected.append(column)
+
+    sql, params = queryset.values_list(*selected).query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    frame = {}
+    for i, column in enumerate(columns):
+        values = [row[i] for row in rows]
+        if kinds.get(column) == 'date':
+            values = np.array(values, dtype='datetime64[D]')
+        elif kinds.get(column) == 'datetime':
+            values = pd.to_datetime(values, utc=True, format='ISO8601')
+        frame[column] = pd.Series(values)
+    return pd.DataFrame(frame)
+
+
+def load_frames(start, end):
+    # Only PRESENT marks matter: anything else is derived from their absence.
+    attendance = fetch_frame(
+        Attendance.objects.filter(date__range=(start, end), status='PRESENT'), ['user_id', 'date', 'marked_at']
+    )
+    leaves = fetch_frame(
+        LeaveRequest.objects.filter(status='APPROVED').overlapping(start, end),
+        ['employee_id', 'start_date', 'end_date'],
+    )
+    users = fetch_frame(User.objects.filter(is_active=True).order_by('pk'), ['id', 'username'])
+    teams = fetch_frame(User.groups.through.objects.filter(user__is_active=True), ['user_id', 'group__name'])
+    return attendance, leaves, users, teams
+
+
+def business_days(start, end):
+    holidays = np.array(get_holiday_calendar().between(start, end), dtype='datetime64[D]')
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    return days[np.is_busday(days, holidays=holidays)]
+
+
+def day_matrices(attendance, leaves, users, days):
+    # Users x business days: who marked PRESENT, and who was on approved leave.
+    rows = pd.Index(users['id'])
+    present = np.zeros((len(rows), len(days)), dtype=bool)
+    marked_days = attendance['date'].values.astype('datetime64[D]')
+    user_pos = rows.get_indexer(attendance['user_id'])
+    day_pos = np.searchsorted(days, marked_days)
+    hit = (user_pos >= 0) & (day_pos < len(days))
+    hit[hit] &= days[day_pos[hit]] == marked_days[hit]
+    present[user_pos[hit], day_pos[hit]] = True
+
+    # Leave ranges become +1/-1 at their first/after-last business day; a
+    # cumulative sum along each row then covers every day in between.
+    coverage = np.zeros((len(rows), len(days) + 1), dtype=np.int32)
+    leave_pos = rows.get_indexer(leaves['employee_id'])
+    first = np.searchsorted(days, leaves['start_date'].values.astype('datetime64[D]'), side='left')
+    after = np.searchsorted(days, leaves['end_date'].values.astype('datetime64[D]'), side='right')
+    keep = (leave_pos >= 0) & (first < after)
+    np.add.at(coverage, (leave_pos[keep], first[keep]), 1)
+    np.add.at(coverage, (leave_pos[keep], after[keep]), -1)
+    on_leave = np.cumsum(coverage, axis=1)[:, :-1] > 0
+    return present, on_leave
+
+
+def run_lengths(flags):
+    # Length of the run of True ending at each position, row by row.
+    counts = np.cumsum(flags, axis=1)
+    resets = np.maximum.accumulate(np.where(flags, 0, counts), axis=1)
+    return counts - resets
+
+
+def late_after_minutes():
+    hours, minutes = settings.ATTENDANCE_LATE_AFTER.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def attendance_report(start, end):
+    return compute_report(start, end, *load_frames(start, end))
+
+
+def compute_report(start, end, attendance, leaves, users, teams):
+    days = business_days(start, end)
+    present, on_leave = day_matrices(attendance, leaves, users, days)
+    absent = ~present & ~on_leave
+
+    expected = (~on_leave).sum(axis=1)
+    present_days = (present & ~on_leave).sum(axis=1)
+    streaks = run_lengths(absent) if len(days) else np.zeros((len(users), 1), dtype=int)
+
+    # Late marking: local time of day of each mark against the cut-off.
+    local = attendance['marked_at'].dt.tz_convert(settings.TIME_ZONE).dt.tz_localize(None).values
+    local_days = local.astype('datetime64[D]')
+    minutes = (local - local_days).astype('timedelta64[m]').astype(np.int64)
+    late = minutes > late_after_minutes()
+
+    user_pos = pd.Index(users['id']).get_indexer(attendance['user_id'])
+    known = user_pos >= 0
+    marks = np.bincount(user_pos[known], minlength=len(users))
+    late_marks = np.bincount(user_pos[known], weights=late[known], minlength=len(users))
+    minute_total = np.bincount(user_pos[known], weights=minutes[known], minlength=len(users))
+    average = np.divide(minute_total, marks, out=np.full(len(users), np.nan), where=marks > 0)
+
+    employees = pd.DataFrame({
+        'user_id': users['id'],
+        'username': users['username'],
+        'expected_days': expected,
+        'present_days': present_days,
+        'leave_days': on_leave.sum(axis=1),
+        'attendance_pct': _pct(present_days, expected),
+        'longest_absence_streak': streaks.max(axis=1),
+        'current_absence_streak': streaks[:, -1],
+        'late_marks': late_marks.astype(np.int64),
+        'late_pct': _pct(late_marks, marks),
+        'avg_mark_time': [
+            '' if np.isnan(value) else f"{int(value) // 60:02d}:{int(value) % 60:02d}" for value in average
+        ],
+    })
+
+    # 1970-01-01 was a Thursday; shift so Monday is 0.
+    weekdays = (local_days.view(np.int64) + 3) % 7
+    late_by_weekday = pd.Series(
+        _pct(np.bincount(weekdays, weights=late, minlength=7), np.bincount(weekdays, minlength=7))[:5],
+        index=['Mon', 'Tue', 'Wed', 'Thu', 'Fri'],
+        name='late_pct',
+    )
+
+    return {
+        'start': start,
+        'end': end,
+        'business_days': len(days),
+        'employees': employees,
+        'late_by_weekday': late_by_weekday,
+        'team_heatmap': team_heatmap(users, teams, present & ~on_leave, ~on_leave, days),
+    }
+
+
+def _pct(part, whole):
+    return np.round(np.divide(part * 100.0, whole, out=np.zeros(len(whole)), where=whole > 0), 1)
+
+
+def team_heatmap(users, teams, present, expected, days):
+    # Team x business day attendance %; auth groups are the teams. A user in
+    # several groups counts towards each of them.
+    membership = pd.concat([
+        teams.rename(columns={'group__name': 'team'}),
+        pd.DataFrame({'user_id': users.loc[~users['id'].isin(teams['user_id']), 'id'], 'team': UNASSIGNED}),
+    ])
+    rows = pd.Index(users['id']).get_indexer(membership['user_id'])
+    membership = membership[rows >= 0]
+    rows = rows[rows >= 0]
+
+    # Sort members by team and sum each team's block of rows with reduceat.
+    team_codes, team_names = pd.factorize(membership['team'], sort=True)
+    order = np.argsort(team_codes, kind='stable')
+    starts = np.searchsorted(team_codes[order], np.arange(len(team_names)))
+    if len(team_names) and len(days):
+        present_by_team = np.add.reduceat(present[rows[order]], starts, axis=0, dtype=np.int64)
+        expected_by_team = np.add.reduceat(expected[rows[order]], starts, axis=0, dtype=np.int64)
+        pct = np.round(np.divide(
+            present_by_team * 100.0, expected_by_team,
+            out=np.zeros(present_by_team.shape), where=expected_by_team > 0,
+        ), 1)
+    else:
+        pct = np.zeros((len(team_names), len(days)))
+    return pd.DataFrame(pct, index=team_names, columns=pd.DatetimeIndex(days).date)
+
+
+def report_json(report):
+    heatmap = report['team_heatmap']
+    return {
+        'start': report['start'],
+        'end': report['end'],
+        'business_days': report['business_days'],
+        'employees': report['employees'].to_dict(orient='records'),
+        'late_by_weekday': report['late_by_weekday'].to_dict(),
+        'team_heatmap': {
+            'days': [day.isoformat() for day in heatmap.columns],
+            'teams': {team: row.tolist() for team, row in heatmap.iterrows()},
+        },
+    }
+
+
+def report_xlsx(report):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        report['employees'].to_excel(writer, sheet_name='Employees', index=False)
+        report['team_heatmap'].to_excel(writer, sheet_name='Team heatmap', index_label='Team')
+        report['late_by_weekday'].to_excel(writer, sheet_name='Late by weekday', index_label='Weekday')
+    output.seek(0)
+    return output
@@ -0,0 +1,82 @@
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime, time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LeaveLog
+
+ARCHIVE_FIELDS = (
+    'id', 'leave_id', 'leave__employee__username', 'changed_by__username',
+    'previous_status', 'new_status', 'changed_at',
+)
+
+
+def archive_cutoff(months, today=None):
+    # First day of the month `months` months before today.
+    today = today or timezone.localdate()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return today.replace(year=year, month=month + 1, day=1)
+
+
+def archive_path(month):
+    return Path(settings.LEAVE_LOG_ARCHIVE_DIR) / f"leave_logs_{month}.jsonl.gz"
+
+
+def archive_leave_logs(before, chunk_size=5000):
+    # Moves LeaveLog rows older than `before` into one gzip-compressed JSONL file
+    # per month (appending, so reruns and partial runs are fine) and deletes them
+    # from the hot table chunk by chunk. The file and the table can't share a
+    # transaction, so a run that dies between writing a chunk and deleting it
+    # leaves rows that are already archived; the rerun skips writing those ids.
+    Path(settings.LEAVE_LOG_ARCHIVE_DIR).mkdir(parents=True, exist_ok=True)
+    boundary = timezone.make_aware(datetime.combine(before, time.min))
+    queryset = LeaveLog.objects.filter(changed_at__lt=boundary).order_by('changed_at', 'id')
+    archived = 0
+    archived_ids = {}  # month -> ids already in its file
+    while True:
+        rows = list(queryset.values(*ARCHIVE_FIELDS)[:chunk_size])
+        if not rows:
+            return archived
+
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[timezone.localtime(row['changed_at']).strftime('%Y-%m')].append(row)
+        for month, month_rows in by_month.items():
+            if month not in archived_ids:
+                archived_ids[month] = _archived_ids(month)
+            month_rows = [row for row in month_rows if row['id'] not in archived_ids[month]]
+            if not month_rows:
+                continue
+            with gzip.open(archive_path(month), 'at', encoding='utf-8') as fh:
+                for row in month_rows:
+                    fh.write(json.dumps({
+                        'id': row['id'],
+                        'leave_id': row['leave_id'],
+                        'employee': row['leave__employee__username'],
+                        'changed_by': row['changed_by__username'],
+                        'previous_status': row['previous_status'],
+                        'new_status': row['new_status'],
+                        'changed_at': row['changed_at'].isoformat(),
+                    }) + '\n')
+            archived_ids[month].update(row['id'] for row in month_rows)
+
+        with transaction.atomic():
+            LeaveLog.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+
+
+def _archived_ids(month):
+    if not archive_path(month).exists():
+        return set()
+    return {row['id'] for row in read_archive(month)}
+
+
+def read_archive(month):
+    with gzip.open(archive_path(month), 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            yield json.loads(line)
@@ -0,0 +1,101 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .models import LeaveLog
+
+# Context variables follow the request into sync_to_async/async_to_sync hops,
+# so unlike a thread-local they are safe under both WSGI and ASGI workers.
+# The user is kept behind a closure: asgiref isinstance()-checks every context
+# value on each hop, which would resolve the lazy request.user (a database
+# query) inside the event loop.
+_current_user = ContextVar('current_user', default=None)
+_log_writer = ContextVar('leave_log_writer', default=None)
+
+
+def set_current_user(user):
+    return _current_user.set(lambda: user)
+
+
+def reset_current_user(token):
+    _current_user.reset(token)
+
+
+def get_current_user():
+    getter = _current_user.get()
+    user = getter() if getter is not None else None
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+class CurrentUserMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = set_current_user(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_current_user(token)
+
+    async def __acall__(self, request):
+        token = set_current_user(request.user)
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_current_user(token)
+
+
+class LeaveLogWriter:
+    # Collects LeaveLog rows and writes them with one bulk_create. While used as
+    # a context manager it also captures the rows produced by the pre_save
+    # signal, so any block of saves can be audited in a single INSERT.
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.pending = []
+        self._token = None
+
+    def add(self, leave, previous_status, new_status, changed_by=None):
+        self.pending.append(LeaveLog(
+            leave_id=getattr(leave, 'pk', leave),
+            changed_by=changed_by,
+            previous_status=previous_status,
+            new_status=new_status,
+        ))
+
+    def flush(self):
+        if self.pending:
+            LeaveLog.objects.bulk_create(self.pending, batch_size=self.batch_size)
+        self.pending = []
+
+    def __enter__(self):
+        self._token = _log_writer.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _log_writer.reset(self._token)
+        if exc_type is None:
+            self.flush()
+
+
+def write_leave_log(leave, previous_status, new_status, changed_by=None):
+    writer = _log_writer.get()
+    if writer is not None:
+        writer.add(leave, previous_status, new_status, changed_by)
+    else:
+        LeaveLog.objects.create(
+            leave=leave,
+            previous_status=previous_status,
+            new_status=new_status,
+            changed_by=changed_by,
+        )
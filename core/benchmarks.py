@@ -0,0 +1,136 @@
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from config.celery import app as celery_app
+from .exports import build_pdf_export, report_queryset
+from .models import Attendance, ExportJob
+from .tasks import send_attendance_reminder
+
+# Benchmarked views and tasks, shared by `manage.py run_benchmarks` and the
+# query-budget tests. `budget` is the most queries one run may make. It must
+# not grow with the number of rows shown, which is what makes it catch N+1s;
+# exports read in fixed-size chunks, so theirs is a function of the data.
+Scenario = namedtuple('Scenario', 'name budget max_iterations run')
+
+BenchmarkData = namedtuple('BenchmarkData', 'client admin day user_ids')
+
+
+def prepare(client=None):
+    # Reads what a seeded database looks like and logs a staff client in.
+    admin = User.objects.filter(is_staff=True, is_superuser=True).order_by('pk').first()
+    if admin is None:
+        admin = User.objects.create_user('benchmark-admin', is_staff=True, is_superuser=True)
+    day = Attendance.objects.order_by('-date').values_list('date', flat=True).first()
+    if day is None:
+        raise ValueError("No attendance to benchmark; run `manage.py seed_demo_data` first.")
+    client = client or Client(HTTP_HOST='localhost')
+    client.force_login(admin)
+    user_ids = list(User.objects.filter(is_staff=False).order_by('pk').values_list('pk', flat=True)[:100])
+    return BenchmarkData(client, admin, day, user_ids)
+
+
+def _get(data, name, **params):
+    response = data.client.get(reverse(name), params)
+    if response.status_code != 200:
+        raise AssertionError(f"{name} returned {response.status_code}")
+    return response
+
+
+def _attendance_summary(data):
+    _get(data, 'attendance_summary', date=data.day.isoformat())
+
+
+def _attendance_summary_absent(data):
+    _get(data, 'attendance_summary', date=data.day.isoformat(), show='absent')
+
+
+def _admin_leave_list(data):
+    _get(data, 'admin_leave_list')
+
+
+def _admin_leave_list_json(data):
+    _get(data, 'admin_leave_list', status='APPROVED', format='json')
+
+
+def _leave_logs(data):
+    _get(data, 'leave_logs')
+
+
+def _manual_attendance(data):
+    _get(data, 'manual_attendance')
+
+
+def _manual_attendance_post(data):
+    response = data.client.post(reverse('manual_attendance'), {
+        'date': data.day.isoformat(), 'status': 'PRESENT', 'user_ids': data.user_ids,
+    })
+    if response.status_code != 302:
+        raise AssertionError(f"manual_attendance POST returned {response.status_code}")
+
+
+def _pdf_export(kind, params):
+    def run(data):
+        job = ExportJob.objects.create(requested_by=data.admin, kind=kind, params=params(data))
+        with tempfile.TemporaryDirectory() as export_root, override_settings(EXPORT_ROOT=export_root):
+            build_pdf_export(job)
+    return run
+
+
+def _pdf_export_budget(kind, params):
+    # The job INSERT, one query per chunk and the empty read that ends the loop.
+    def budget(data):
+        rows = report_queryset(kind, params(data)).count()
+        return 2 + rows // settings.EXPORT_PDF_CHUNK_SIZE + 1
+    return budget
+
+
+def query_budget(scenario, data):
+    return scenario.budget(data) if callable(scenario.budget) else scenario.budget
+
+
+@contextmanager
+def _eager_celery():
+    # The reminder fans out through a Celery group; run it inline with
+    # in-memory mail so the whole path is timed without a broker.
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    try:
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            yield
+    finally:
+        celery_app.conf.task_always_eager = previous
+
+
+def _send_attendance_reminder(data):
+    with _eager_celery():
+        send_attendance_reminder.apply().get()
+
+
+def _attendance_day(data):
+    return {'date': data.day.isoformat()}
+
+
+def _no_params(data):
+    return {}
+
+
+SCENARIOS = [
+    Scenario('attendance_summary', 6, None, _attendance_summary),
+    Scenario('attendance_summary_absent', 6, None, _attendance_summary_absent),
+    Scenario('admin_leave_list', 5, None, _admin_leave_list),
+    Scenario('admin_leave_list_json', 5, None, _admin_leave_list_json),
+    Scenario('leave_logs', 5, None, _leave_logs),
+    Scenario('manual_attendance', 5, None, _manual_attendance),
+    Scenario('manual_attendance_post', 12, None, _manual_attendance_post),
+    Scenario('export_attendance_pdf', _pdf_export_budget('attendance', _attendance_day), 3,
+             _pdf_export('attendance', _attendance_day)),
+    Scenario('export_leave_pdf', _pdf_export_budget('leave', _no_params), 1, _pdf_export('leave', _no_params)),
+    Scenario('export_holiday_pdf', _pdf_export_budget('holiday', _no_params), 3, _pdf_export('holiday', _no_params)),
+    Scenario('send_attendance_reminder', 8, None, _send_attendance_reminder),
+]
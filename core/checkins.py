@@ -0,0 +1,193 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .holidays import get_holiday_calendar
+from .services import mark_attendance_bulk
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+HOLIDAY = 'holiday'
+UNKNOWN_USER = 'unknown_user'
+INVALID = 'invalid'
+
+MAX_USER_ID = 2 ** 63 - 1  # largest primary key the database can hold
+
+
+def parse_events(body):
+    # One JSON object per line: {"user_id": 12, "timestamp": "2025-07-10T09:01:12+05:30"}
+    # ("date" may be given instead of "timestamp"; neither means today). The
+    # timestamp is kept as the row's marked_at: devices upload their buffers
+    # late, and lateness is measured from when the badge was read. Raises
+    # ValueError for a body that isn't UTF-8.
+    try:
+        lines = body.decode('utf-8').splitlines()
+    except UnicodeDecodeError as exc:
+        raise ValueError("Check-in body must be UTF-8 encoded") from exc
+
+    events = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            moment = None
+            if data.get('timestamp'):
+                moment = datetime.fromisoformat(data['timestamp'])
+                if timezone.is_naive(moment):
+                    moment = timezone.make_aware(moment)
+                day = timezone.localdate(moment)
+            elif data.get('date'):
+                day = date.fromisoformat(data['date'])
+            else:
+                day = timezone.localdate()
+            user_id = int(data['user_id'])
+            if not 0 < user_id <= MAX_USER_ID:
+                raise ValueError(f"user_id out of range: {user_id}")
+            events.append({'user_id': user_id, 'date': day, 'marked_at': moment})
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError):
+            events.append(None)
+    return events
+
+
+def process_checkins(events):
+    # Writes a batch of parsed events and returns one result per event. Rows are
+    # grouped per date so each date costs one lookup and one upsert.
+    results = [INVALID if event is None else None for event in events]
+
+    holidays = get_holiday_calendar()
+
+    by_date = defaultdict(dict)
+    for i, event in enumerate(events):
+        if event is None:
+            continue
+        if event['date'] in holidays:
+            results[i] = HOLIDAY
+        elif event['user_id'] in by_date[event['date']]:
+            results[i] = DUPLICATE  # repeated within this batch
+        else:
+            by_date[event['date']][event['user_id']] = i
+
+    for day, indexes in by_date.items():
+        if not indexes:
+            continue
+        marked_at = {user_id: events[i]['marked_at'] for user_id, i in indexes.items() if events[i]['marked_at']}
+        outcome = mark_attendance_bulk(indexes.keys(), day, 'PRESENT', overwrite=False, marked_at=marked_at)
+        for user_id in outcome.created + outcome.updated:
+            results[indexes[user_id]] = ACCEPTED
+        for user_id in outcome.skipped:
+            results[indexes[user_id]] = DUPLICATE
+        for user_id in outcome.unknown:
+            results[indexes[user_id]] = UNKNOWN_USER
+    return results
+
+
+class PendingBatch:
+    def __init__(self, events):
+        self.events = events
+        self.results = None
+        self.error = None
+        self._done = threading.Event()
+
+    def resolve(self, results=None, error=None):
+        self.results, self.error = results, error
+        self._done.set()
+
+    def wait(self, timeout):
+        if not self._done.wait(timeout):
+            raise TimeoutError("Check-in batch was not flushed in time")
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+
+class CheckinQueue:
+    # Group commit: request threads enqueue their events and wait while a single
+    # worker thread drains everything that arrived within `max_wait` seconds (up
+    # to `max_events`) and flushes it in one pass, so a burst of small requests
+    # turns into a handful of large upserts.
+
+    def __init__(self, max_events, max_wait):
+        self.max_events = max_events
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, events):
+        pending = PendingBatch(events)
+        self._queue.put(pending)
+        self._ensure_worker()
+        return pending
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='checkin-flusher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batches = [self._queue.get()]
+            size = len(batches[0].events)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batches.append(batch)
+                size += len(batch.events)
+            self._flush(batches)
+
+    def _flush(self, batches):
+        close_old_connections()
+        events = [event for batch in batches for event in batch.events]
+        try:
+            with transaction.atomic():
+                results = process_checkins(events)
+        except Exception as exc:
+            if len(batches) == 1:
+                logger.exception("Failed to flush %d check-in events", len(events))
+                batches[0].resolve(error=exc)
+                return
+            # The combined write rolled back; write each request's batch on its
+            # own so one device's bad upload doesn't fail everyone else's.
+            logger.exception("Failed to flush %d check-in events; retrying per batch", len(events))
+            for batch in batches:
+                self._flush([batch])
+            return
+
+        offset = 0
+        for batch in batches:
+            batch.resolve(results=results[offset:offset + len(batch.events)])
+            offset += len(batch.events)
+
+
+checkin_queue = CheckinQueue(
+    max_events=settings.CHECKIN_FLUSH_MAX_EVENTS,
+    max_wait=settings.CHECKIN_FLUSH_INTERVAL,
+)
+
+
+def ingest_checkins(events):
+    if not settings.CHECKIN_QUEUE_ENABLED:
+        return process_checkins(events)
+    return checkin_queue.submit(events).wait(settings.CHECKIN_RESULT_TIMEOUT)
+
+
+def summarize(results):
+    return dict(Counter(results))
@@ -0,0 +1,107 @@
+import threading
+import uuid
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Per-user cache of rendered dashboard fragments (and any other per-user
+# value). Each (namespace, user) pair has a version token that is part of the
+# cache key; writes to the underlying rows replace the token, which orphans
+# every entry built from the old data without having to find and delete it.
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def _version_key(namespace, user_id):
+    return f"dash:version:{namespace}:{user_id}"
+
+
+def _count(namespace, outcome):
+    with _stats_lock:
+        _stats[f"{namespace}:{outcome}"] += 1
+
+
+def get_version(namespace, user_id):
+    cache = _cache()
+    key = _version_key(namespace, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(namespace, user_ids):
+    # Deferred until the write commits: bumped any earlier, a concurrent reader
+    # could rebuild from the old rows and cache them under the new version.
+    keys = [_version_key(namespace, user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(partial(_set_versions, keys))
+
+
+def _set_versions(keys):
+    token = uuid.uuid4().hex
+    _cache().set_many(dict.fromkeys(keys, token), None)
+
+
+def get_or_set(namespace, user_id, builder, timeout=None):
+    cache = _cache()
+    key = f"dash:{namespace}:{user_id}:{get_version(namespace, user_id)}"
+    value = cache.get(key)
+    if value is not None:
+        _count(namespace, 'hit')
+        return value
+    _count(namespace, 'miss')
+    value = builder()
+    cache.set(key, value, settings.DASHBOARD_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+async def aget_version(namespace, user_id):
+    cache = _cache()
+    key = _version_key(namespace, user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid.uuid4().hex, None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_or_set(namespace, user_id, builder, timeout=None):
+    # get_or_set() for async views; `builder` is a coroutine function.
+    cache = _cache()
+    key = f"dash:{namespace}:{user_id}:{await aget_version(namespace, user_id)}"
+    value = await cache.aget(key)
+    if value is not None:
+        _count(namespace, 'hit')
+        return value
+    _count(namespace, 'miss')
+    value = await builder()
+    await cache.aset(key, value, settings.DASHBOARD_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    namespaces = {key.rsplit(':', 1)[0] for key in stats}
+    return {
+        namespace: {
+            'hits': stats.get(f"{namespace}:hit", 0),
+            'misses': stats.get(f"{namespace}:miss", 0),
+        }
+        for namespace in sorted(namespaces)
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,133 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import F
+from django.db.models.constants import OnConflict
+
+
+# -------------------- SQLite tuning --------------------
+
+def apply_sqlite_pragmas(connection):
+    # Run for every new SQLite connection (see core.signals). WAL lets readers
+    # keep going while a writer commits and busy_timeout makes writers wait
+    # for the lock instead of failing with "database is locked".
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def lock_for_write(queryset):
+    # Call first thing inside atomic(). SQLite ignores select_for_update() and
+    # starts every transaction as a reader; if another connection commits
+    # before it writes, the upgrade fails at once with "database is locked",
+    # busy_timeout or not. A no-op UPDATE makes it a writer from the start,
+    # so it queues behind the other writer instead.
+    if connections[queryset.db].vendor == 'sqlite':
+        pk = queryset.model._meta.pk.attname
+        queryset.update(**{pk: F(pk)})
+
+
+def insert_rows(model, fields, rows, ignore_conflicts=False, batch_size=10000):
+    # Raw INSERTs of plain tuples through executemany(), for the batch jobs that
+    # write hundreds of thousands of rows: at those volumes bulk_create() spends
+    # most of its time building model instances. Values must already be in
+    # database form (connection.ops.adapt_*_value); no signals are sent. With
+    # ignore_conflicts, rows that would break a unique constraint are skipped.
+    connection = connections[router.db_for_write(model)]
+    ops = connection.ops
+    fields = [model._meta.get_field(name) for name in fields]
+    columns = ', '.join(ops.quote_name(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    sql = (
+        f"{ops.insert_statement(on_conflict=on_conflict)} {ops.quote_name(model._meta.db_table)} "
+        f"({columns}) VALUES ({placeholders}) {ops.on_conflict_suffix_sql(fields, on_conflict, None, None)}"
+    ).rstrip()
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[i:i + batch_size])
+
+
+def release_connections():
+    # Closes this thread's open connections between bursts of work in a
+    # long-lived request, such as a streaming response; one inside a
+    # transaction (a test's, say) is left alone.
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+# -------------------- Replica routing --------------------
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_alias():
+    # Falls back to the primary when no replica is configured, or when the
+    # replica is the primary's own database, as a test mirror is. A second
+    # connection to it would sit outside the test's transaction.
+    alias = settings.DATABASE_REPLICA_ALIAS
+    if alias not in settings.DATABASES:
+        return DEFAULT_DB_ALIAS
+    if connections[alias].settings_dict['NAME'] == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+class read_from_replica:
+    # Decorator / context manager for read-only work: ORM reads inside it go
+    # to the replica, writes still go to the primary. Replicas can lag, so use
+    # it for reports and exports, not for pages that read back what the same
+    # user just wrote. On views, put it below the login decorators so the
+    # session and user are still read from the primary.
+    replica = True
+
+    def __enter__(self):
+        self._token = _use_replica.set(self.replica)
+        return self
+
+    def __exit__(self, *exc_info):
+        _use_replica.reset(self._token)
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with type(self)():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with type(self)():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class read_from_primary(read_from_replica):
+    # For code that reads in order to write (rebuilding a rollup, say), even
+    # when called from inside a replica-reading view.
+    replica = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary, never from migrate.
+        return db == DEFAULT_DB_ALIAS
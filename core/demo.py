@@ -0,0 +1,169 @@
+import random
+from collections import defaultdict
+from datetime import date, datetime, time as clock, timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .db import insert_rows
+from .holidays import invalidate_holiday_calendar
+from .models import (
+    Attendance, Holiday, LeaveBalance, LeaveLedgerEntry, LeaveLog, LeaveRequest, LeaveType,
+)
+from .workdays import holiday_array, working_days
+
+DEMO_PASSWORD = 'demo'
+LEAVE_TYPES = (('Casual', 12), ('Sick', 10), ('Earned', 18))
+HOLIDAYS = ((1, 1, "New Year's Day"), (1, 26, 'Republic Day'), (8, 15, 'Independence Day'),
+            (10, 2, 'Gandhi Jayanti'), (12, 25, 'Christmas'))
+LEAVE_REASONS = ('Family function', 'Not feeling well', 'Personal work', 'Travel', 'Medical appointment')
+
+
+def _moment(day, minutes):
+    moment = datetime.combine(day, clock(0), tzinfo=timezone.get_current_timezone()) + timedelta(minutes=minutes)
+    return connection.ops.adapt_datetimefield_value(moment)
+
+
+@transaction.atomic
+def seed_demo_data(users=1000, days=365, teams=20, leaves_per_year=8, seed=0, end=None):
+    # Generates a company's worth of history ending yesterday: employees in
+    # teams, holidays, leave types with opening balances, leave requests with
+    # their decisions, audit logs and ledger debits, and one attendance row per
+    # employee per working day (PRESENT, ABSENT or ON_LEAVE, as the backfill
+    # would leave it). Everything goes in through insert_rows(), so millions
+    # of rows take minutes rather than hours. Returns the row counts.
+    rng = random.Random(seed)
+    end = end or timezone.localdate() - timedelta(days=1)
+    start = end - timedelta(days=days - 1)
+    counts = {}
+
+    leave_types = [
+        LeaveType.objects.get_or_create(name=name, defaults={'annual_limit': limit})[0]
+        for name, limit in LEAVE_TYPES
+    ]
+    Holiday.objects.bulk_create([
+        Holiday(name=name, date=date(year, month, day))
+        for year in range(start.year, end.year + 1)
+        for month, day, name in HOLIDAYS
+    ], ignore_conflicts=True)
+    # bulk_create() sends no post_save. Invalidated now for the working-day
+    # counts below, and again once the new holidays are visible to other workers.
+    invalidate_holiday_calendar()
+    transaction.on_commit(invalidate_holiday_calendar)
+    holidays = holiday_array()
+
+    admin, created = User.objects.get_or_create(
+        username='demo-admin', defaults={'is_staff': True, 'is_superuser': True, 'email': 'demo-admin@example.com'}
+    )
+    if created:
+        admin.set_password(DEMO_PASSWORD)
+        admin.save()
+
+    # -- Employees and teams --
+    offset = User.objects.filter(username__startswith='demo-').exclude(pk=admin.pk).count()
+    password = make_password(DEMO_PASSWORD)  # hashed once; hashing per user would dominate the run
+    joined = _moment(start - timedelta(days=30), 9 * 60)
+    names = [f'demo-{offset + i:07d}' for i in range(users)]
+    insert_rows(User, ('username', 'password', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser',
+                       'is_active', 'date_joined'),
+                [(name, password, f'{name}@example.com', '', '', False, False, True, joined) for name in names])
+    # Zero-padded names sort in insertion order, so the new batch is one username range.
+    user_ids = list(
+        User.objects.filter(username__gte=names[0], username__lte=names[-1]).order_by('pk').values_list('pk', flat=True)
+    ) if names else []
+    counts['users'] = len(user_ids)
+
+    groups = [Group.objects.get_or_create(name=f'demo-team-{i:03d}')[0] for i in range(teams)]
+    if groups:
+        insert_rows(User.groups.through, ('user', 'group'),
+                    [(user_id, groups[i % len(groups)].pk) for i, user_id in enumerate(user_ids)])
+
+    # -- Leave requests, non-overlapping per employee: at most one per week --
+    weeks = max((end - start).days // 7, 1)
+    first_monday = start - timedelta(days=start.weekday())
+    per_user = max(1, round(leaves_per_year * days / 365))
+    leaves = []
+    for user_id in user_ids:
+        for week in rng.sample(range(weeks), min(per_user, weeks)):
+            leave_start = first_monday + timedelta(weeks=week, days=rng.randrange(3))
+            leave_end = leave_start + timedelta(days=rng.randrange(3))
+            if leave_start < start or leave_end > end:
+                continue
+            leaves.append((user_id, rng.choice(leave_types), leave_start, leave_end))
+
+    chargeable = working_days([leave[2] for leave in leaves], [leave[3] for leave in leaves], holidays)
+    years = end.year - start.year + 1
+    available = {(user_id, leave_type.pk): leave_type.annual_limit * years
+                 for user_id in user_ids for leave_type in leave_types}
+    leave_rows, charges = [], {}
+    for (user_id, leave_type, leave_start, leave_end), charge in zip(leaves, chargeable):
+        roll = rng.random()
+        status = 'APPROVED' if roll < 0.75 else 'REJECTED' if roll < 0.9 else 'PENDING'
+        if status == 'APPROVED':
+            if charge > available[user_id, leave_type.pk]:
+                status = 'REJECTED'
+            else:
+                available[user_id, leave_type.pk] -= int(charge)
+                charges[user_id, leave_start] = int(charge)  # one leave per employee per week
+        created_at = _moment(leave_start - timedelta(days=rng.randrange(1, 21)), rng.randrange(9 * 60, 18 * 60))
+        leave_rows.append((user_id, leave_type.pk, leave_start, leave_end, rng.choice(LEAVE_REASONS),
+                           status, created_at))
+    insert_rows(LeaveRequest, ('employee', 'leave_type', 'start_date', 'end_date', 'reason', 'status', 'created_at'),
+                leave_rows)
+    counts['leave_requests'] = len(leave_rows)
+
+    # Decisions: an audit log row each, plus a ledger debit and leave days for approvals.
+    granted_at = _moment(start, 0)
+    ledger_rows = [
+        (user_id, leave_type.pk, None, 'GRANT', leave_type.annual_limit * years, 'Demo opening balance',
+         admin.pk, granted_at)
+        for user_id in user_ids for leave_type in leave_types
+    ]
+    log_rows = []
+    away = defaultdict(set)
+    decided = (
+        LeaveRequest.objects.filter(employee_id__gte=user_ids[0], employee_id__lte=user_ids[-1])
+        .exclude(status='PENDING')
+        .values_list('pk', 'employee_id', 'leave_type_id', 'start_date', 'end_date', 'status', 'created_at')
+    ) if user_ids else LeaveRequest.objects.none()
+    for pk, user_id, leave_type_id, leave_start, leave_end, status, created_at in decided.iterator(chunk_size=10000):
+        decided_at = connection.ops.adapt_datetimefield_value(created_at + timedelta(hours=rng.randrange(1, 48)))
+        log_rows.append((pk, admin.pk, 'PENDING', status, decided_at))
+        if status == 'APPROVED':
+            ledger_rows.append((user_id, leave_type_id, pk, 'DEBIT', -charges[user_id, leave_start],
+                                'Demo leave', admin.pk, decided_at))
+            for offset_days in range((leave_end - leave_start).days + 1):
+                away[leave_start + timedelta(days=offset_days)].add(user_id)
+    insert_rows(LeaveLog, ('leave', 'changed_by', 'previous_status', 'new_status', 'changed_at'), log_rows)
+    insert_rows(LeaveLedgerEntry, ('user', 'leave_type', 'leave', 'kind', 'days', 'note', 'created_by', 'created_at'),
+                ledger_rows)
+    insert_rows(LeaveBalance, ('user', 'leave_type', 'remaining'),
+                [(user_id, leave_type_id, remaining) for (user_id, leave_type_id), remaining in available.items()])
+    counts['leave_logs'] = len(log_rows)
+    counts['ledger_entries'] = len(ledger_rows)
+
+    # -- Attendance: one row per employee per working day --
+    calendar = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    attendance = 0
+    for day in calendar[np.is_busday(calendar, holidays=holidays)].tolist():
+        on_leave = away.get(day, ())
+        day_value = connection.ops.adapt_datefield_value(day)
+        # Check-ins from 08:30, most within the first half hour; a minute's
+        # resolution is plenty, so each day's timestamps are formatted once.
+        arrivals = [_moment(day, 8 * 60 + 30 + minute) for minute in range(240)]
+        closed = _moment(day, 23 * 60 + 59)
+        rows = []
+        for user_id in user_ids:
+            if user_id in on_leave:
+                rows.append((user_id, day_value, 'ON_LEAVE', closed))
+            elif rng.random() < 0.93:
+                rows.append((user_id, day_value, 'PRESENT', arrivals[min(int(rng.expovariate(1 / 25)), 239)]))
+            else:
+                rows.append((user_id, day_value, 'ABSENT', closed))
+        insert_rows(Attendance, ('user', 'date', 'status', 'marked_at'), rows)
+        attendance += len(rows)
+    counts['attendance'] = attendance
+    return counts
@@ -0,0 +1,221 @@
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from openpyxl import Workbook
+from PyPDF2 import PdfReader, PdfWriter
+from weasyprint import HTML
+
+from .models import Attendance, LeaveRequest, Holiday
+
+
+# -------------------- PDF reports --------------------
+
+PDF_REPORTS = {
+    'attendance': {
+        'template': 'core/export_attendance_pdf.html',
+        'context_name': 'records',
+        'filename': 'Attendance_{date}.pdf',
+    },
+    'leave': {
+        'template': 'core/export_leave_pdf.html',
+        'context_name': 'leaves',
+        'filename': 'Leave_Requests.pdf',
+    },
+    'holiday': {
+        'template': 'core/admin_export_pdf.html',
+        'context_name': 'queryset',
+        'filename': 'holidays.pdf',
+    },
+}
+
+
+def report_queryset(kind, params):
+    if kind == 'attendance':
+        return Attendance.objects.filter(date=params['date']).select_related('user')
+    if kind == 'leave':
+        return LeaveRequest.objects.select_related('employee')
+    if kind == 'holiday':
+        return Holiday.objects.all()
+    raise ValueError(f"Unknown export kind: {kind}")
+
+
+def report_context(kind, params):
+    if kind == 'attendance':
+        return {'date': date.fromisoformat(params['date'])}
+    if kind == 'holiday':
+        return {'title': 'Holidays'}
+    return {}
+
+
+def report_filename(kind, params):
+    return PDF_REPORTS[kind]['filename'].format(**params)
+
+
+def iter_chunks(queryset, size):
+    # Seek on the primary key instead of OFFSET so late chunks stay as cheap as the first.
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def render_pdf_chunk(kind, rows, context, offset):
+    report = PDF_REPORTS[kind]
+    html_string = render_to_string(report['template'], {
+        **context,
+        report['context_name']: rows,
+        'continued': offset > 0,
+        'offset': offset,
+    })
+    return HTML(string=html_string).write_pdf()
+
+
+def build_pdf_export(job, chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_PDF_CHUNK_SIZE
+    queryset = report_queryset(job.kind, job.params)
+    context = report_context(job.kind, job.params)
+
+    writer = PdfWriter()
+    rows = 0
+    for chunk in iter_chunks(queryset, chunk_size):
+        writer.append(PdfReader(io.BytesIO(render_pdf_chunk(job.kind, chunk, context, rows))))
+        rows += len(chunk)
+
+    if not rows:
+        # Keep the header-only document so an empty report still downloads.
+        writer.append(PdfReader(io.BytesIO(render_pdf_chunk(job.kind, [], context, 0))))
+
+    export_dir = Path(settings.EXPORT_ROOT)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    relative_path = f"{job.pk}_{report_filename(job.kind, job.params)}"
+    with open(export_dir / relative_path, 'wb') as fh:
+        writer.write(fh)
+    return relative_path, rows
+
+
+def export_file_path(job):
+    return Path(settings.EXPORT_ROOT) / job.file_path
+
+
+# -------------------- Streaming CSV / XLSX --------------------
+
+DATASETS = {
+    'attendance': {
+        'columns': (
+            ('Employee', 'user__username'),
+            ('Date', 'date'),
+            ('Status', 'status'),
+            ('Marked At', 'marked_at'),
+        ),
+        'order_by': ('date', 'pk'),
+    },
+    'leave': {
+        'columns': (
+            ('Employee', 'employee__username'),
+            ('Leave Type', 'leave_type__name'),
+            ('Start', 'start_date'),
+            ('End', 'end_date'),
+            ('Status', 'status'),
+            ('Reason', 'reason'),
+            ('Applied At', 'created_at'),
+        ),
+        'order_by': ('start_date', 'pk'),
+    },
+}
+
+XLSX_MAX_ROWS = 1048576
+
+# Spreadsheets run a cell starting with one of these as a formula, so free
+# text (a leave reason) gets a leading ' to keep it text.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def dataset_queryset(dataset, start, end):
+    if dataset == 'attendance':
+        return Attendance.objects.filter(date__range=(start, end))
+    if dataset == 'leave':
+        return LeaveRequest.objects.filter(start_date__lte=end, end_date__gte=start)
+    raise ValueError(f"Unknown dataset: {dataset}")
+
+
+def iter_dataset_rows(dataset, queryset):
+    # values_list() joins the related columns in the same query and skips model
+    # instantiation; iterator() keeps only one chunk of rows in memory at a time.
+    spec = DATASETS[dataset]
+    fields = [field for _, field in spec['columns']]
+    return queryset.order_by(*spec['order_by']).values_list(*fields).iterator(
+        chunk_size=settings.EXPORT_ITERATOR_CHUNK_SIZE
+    )
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        # Excel has no notion of time zones.
+        return timezone.localtime(value).replace(tzinfo=None) if timezone.is_aware(value) else value
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def stream_csv(dataset, queryset, filename):
+    headers = [label for label, _ in DATASETS[dataset]['columns']]
+    rows = iter_dataset_rows(dataset, queryset)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        for i, row in enumerate(rows, start=1):
+            writer.writerow([_cell(value) for value in row])
+            if i % settings.EXPORT_ITERATOR_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def stream_xlsx(dataset, queryset, filename):
+    # Write-only workbooks spool rows to disk as they are appended, so the
+    # worksheet never has to be held in memory.
+    headers = [label for label, _ in DATASETS[dataset]['columns']]
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows = None, XLSX_MAX_ROWS
+    for row in iter_dataset_rows(dataset, queryset):
+        if sheet_rows >= XLSX_MAX_ROWS:
+            sheet = workbook.create_sheet(f"{dataset.title()} {len(workbook.worksheets) + 1}")
+            sheet.append(headers)
+            sheet_rows = 1
+        sheet.append([_cell(value) for value in row])
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(dataset.title()).append(headers)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+EXPORT_FORMATS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
@@ -1,7 +1,9 @@
 from django import forms
-from .models import LeaveRequest, Attendance,Holiday
+from .models import LeaveRequest, Attendance
+from .holidays import get_holiday_calendar
 from django.contrib.auth.models import User
 from django.utils import timezone
+from datetime import datetime, time, timedelta
 
 
 class LeaveForm(forms.ModelForm):
@@ -9,6 +11,10 @@ class LeaveForm(forms.ModelForm):
         model = LeaveRequest
         fields = ['start_date', 'end_date', 'reason']
 
+    def __init__(self, *args, employee=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.employee = employee
+
     def clean_start_date(self):
         start_date = self.cleaned_data.get('start_date')
         if start_date < timezone.localdate():
@@ -25,13 +31,24 @@ class LeaveForm(forms.ModelForm):
                 raise forms.ValidationError("End date cannot be before start date.")
 
             # ✅ Check if any date in range is a holiday
-            holidays = Holiday.objects.filter(date__range=(start_date, end_date))
-            if holidays.exists():
-                holiday_names = ", ".join([h.name for h in holidays])
+            holiday_names = get_holiday_calendar().names_between(start_date, end_date)
+            if holiday_names:
+                holiday_names = ", ".join(holiday_names)
                 raise forms.ValidationError(
                     f"You cannot apply leave on holiday(s): {holiday_names}."
                 )
 
+            if self.employee is not None:
+                clash = (
+                    LeaveRequest.objects.filter(employee=self.employee).active()
+                    .overlapping(start_date, end_date).order_by('start_date').first()
+                )
+                if clash:
+                    raise forms.ValidationError(
+                        f"You already have a {clash.get_status_display().lower()} leave "
+                        f"from {clash.start_date} to {clash.end_date}."
+                    )
+
 class ManualAttendanceForm(forms.ModelForm):
     user = forms.ModelChoiceField(queryset=User.objects.all(), label="Employee")
     date = forms.DateField(widget=forms.SelectDateWidget)
@@ -39,4 +56,49 @@ class ManualAttendanceForm(forms.ModelForm):
 
     class Meta:
         model = Attendance
-        fields = ['user', 'date', 'status']
\ No newline at end of file
+        fields = ['user', 'date', 'status']
+
+
+class BulkAttendanceForm(forms.Form):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    status = forms.ChoiceField(choices=Attendance.STATUS_CHOICES, initial='PRESENT')
+
+
+class LeaveFilterForm(forms.Form):
+    status = forms.ChoiceField(choices=(('', 'All'),) + LeaveRequest.STATUS, required=False)
+    employee = forms.CharField(required=False)
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def filter(self, queryset):
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('employee'):
+            queryset = queryset.filter(employee__username__icontains=data['employee'])
+        if data.get('date_from'):
+            queryset = queryset.filter(end_date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(start_date__lte=data['date_to'])
+        return queryset
+
+
+class LogFilterForm(forms.Form):
+    since = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    until = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    new_status = forms.ChoiceField(choices=(('', 'All'),) + LeaveRequest.STATUS, required=False)
+
+    def filter(self, queryset):
+        # Range bounds are datetimes so the changed_at index can be used.
+        data = self.cleaned_data
+        if data.get('since'):
+            queryset = queryset.filter(changed_at__gte=_start_of_day(data['since']))
+        if data.get('until'):
+            queryset = queryset.filter(changed_at__lt=_start_of_day(data['until'] + timedelta(days=1)))
+        if data.get('new_status'):
+            queryset = queryset.filter(new_status=data['new_status'])
+        return queryset
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
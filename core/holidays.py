@@ -0,0 +1,74 @@
+import uuid
+from bisect import bisect_left, bisect_right
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Holiday
+
+VERSION_KEY = 'core:holiday_calendar:version'
+DATA_KEY = 'core:holiday_calendar:{version}'
+
+
+class HolidayCalendar:
+    # Sorted dates for range lookups via bisect, a dict for O(1) membership and names.
+
+    def __init__(self, holidays):
+        pairs = sorted(holidays)
+        self.dates = [day for day, _ in pairs]
+        self.names = dict(pairs)
+
+    def __contains__(self, day):
+        return day in self.names
+
+    def __len__(self):
+        return len(self.dates)
+
+    def is_holiday(self, day):
+        return day in self.names
+
+    def between(self, start, end):
+        return self.dates[bisect_left(self.dates, start):bisect_right(self.dates, end)]
+
+    def names_between(self, start, end):
+        return [self.names[day] for day in self.between(start, end)]
+
+
+_local = {'version': None, 'calendar': None}
+
+
+def get_holiday_calendar():
+    # The holiday list lives in the shared default cache under a versioned key,
+    # so a change made in one process reaches every web and Celery worker; each
+    # keeps its own parsed copy and only reloads it when the version changes.
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+
+    if _local['version'] == version and _local['calendar'] is not None:
+        return _local['calendar']
+
+    data_key = DATA_KEY.format(version=version)
+    pairs = cache.get(data_key)
+    if pairs is None:
+        pairs = list(Holiday.objects.values_list('date', 'name'))
+        cache.set(data_key, pairs, settings.HOLIDAY_CALENDAR_TIMEOUT)
+
+    calendar = HolidayCalendar(pairs)
+    _local.update(version=version, calendar=calendar)
+    return calendar
+
+
+async def aget_holiday_calendar():
+    # For async views: the version check is an awaited cache round trip and
+    # the rare reload runs the sync loader in a thread.
+    version = await cache.aget(VERSION_KEY)
+    if version is not None and _local['version'] == version and _local['calendar'] is not None:
+        return _local['calendar']
+    return await sync_to_async(get_holiday_calendar)()
+
+
+def invalidate_holiday_calendar():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
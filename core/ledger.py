@@ -0,0 +1,129 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Sum, Value, When
+
+from .db import lock_for_write
+from .models import LeaveBalance, LeaveLedgerEntry, LeaveRequest
+
+
+@transaction.atomic
+def grant_leave(user, leave_type, days, note='', created_by=None):
+    lock_for_write(LeaveBalance.objects.filter(user=user, leave_type=leave_type))
+    balance, _ = LeaveBalance.objects.select_for_update().get_or_create(
+        user=user, leave_type=leave_type, defaults={'remaining': 0}
+    )
+    entry = LeaveLedgerEntry.objects.create(
+        user=user, leave_type=leave_type, kind='GRANT', days=days, note=note, created_by=created_by
+    )
+    LeaveBalance.objects.filter(pk=balance.pk).update(remaining=F('remaining') + days)
+    return entry
+
+
+def _locked_balances(keys):
+    # Row locks on the balances being changed; parallel decisions on the same
+    # balance queue up here instead of both spending the same days. SQLite has
+    # no row locks, so there the whole database is taken for writing first.
+    balances = LeaveBalance.objects.filter(
+        user_id__in={user_id for user_id, _ in keys},
+        leave_type_id__in={leave_type_id for _, leave_type_id in keys},
+    )
+    lock_for_write(balances)
+    return {
+        (balance.user_id, balance.leave_type_id): balance
+        for balance in balances.select_for_update()
+        if (balance.user_id, balance.leave_type_id) in keys
+    }
+
+
+def _set_remaining(balances, remaining):
+    changed = [balance for key, balance in balances.items() if remaining[key] != balance.remaining]
+    if not changed:
+        return
+    # A single CASE update; bulk_update() would split it into batches on SQLite.
+    LeaveBalance.objects.filter(pk__in=[balance.pk for balance in changed]).update(remaining=Case(
+        *[When(pk=balance.pk, then=Value(remaining[balance.user_id, balance.leave_type_id])) for balance in changed],
+        output_field=PositiveIntegerField(),
+    ))
+
+
+def debit_leaves(charges, created_by=None):
+    # `charges` are (leave_id, user_id, leave_type_id, days) in the order they
+    # should be granted. Must run inside the caller's transaction. Returns the
+    # ids of leaves refused because the balance can't cover them; a leave type
+    # the user has no balance row for is not tracked and always passes.
+    balances = _locked_balances({(user_id, leave_type_id) for _, user_id, leave_type_id, _ in charges})
+    remaining = {key: balance.remaining for key, balance in balances.items()}
+
+    entries, refused = [], []
+    for leave_id, user_id, leave_type_id, days in charges:
+        key = (user_id, leave_type_id)
+        if key not in remaining:
+            continue
+        if days > remaining[key]:
+            refused.append(leave_id)
+            continue
+        remaining[key] -= days
+        if days:
+            entries.append(LeaveLedgerEntry(
+                user_id=user_id, leave_type_id=leave_type_id, leave_id=leave_id,
+                kind='DEBIT', days=-days, created_by=created_by,
+            ))
+
+    LeaveLedgerEntry.objects.bulk_create(entries)
+    _set_remaining(balances, remaining)
+    return refused
+
+
+def reverse_leaves(leave_ids, created_by=None):
+    # Gives back whatever the ledger still holds against these leaves. Must run
+    # inside the caller's transaction.
+    lock_for_write(LeaveRequest.objects.filter(pk__in=leave_ids))
+    outstanding = [
+        row for row in LeaveLedgerEntry.objects.filter(leave_id__in=leave_ids)
+        .values('leave_id', 'user_id', 'leave_type_id').annotate(net=Sum('days'))
+        if row['net'] < 0
+    ]
+    if not outstanding:
+        return 0
+
+    credit = Counter()
+    for row in outstanding:
+        credit[row['user_id'], row['leave_type_id']] += -row['net']
+    balances = _locked_balances(set(credit))
+    LeaveLedgerEntry.objects.bulk_create([
+        LeaveLedgerEntry(
+            user_id=row['user_id'], leave_type_id=row['leave_type_id'], leave_id=row['leave_id'],
+            kind='REVERSAL', days=-row['net'], created_by=created_by,
+        )
+        for row in outstanding
+    ])
+    _set_remaining(balances, {key: balance.remaining + credit[key] for key, balance in balances.items()})
+    return len(outstanding)
+
+
+def ledger_totals(queryset=None):
+    # Balances straight from the ledger, one GROUP BY for every user and type.
+    queryset = LeaveLedgerEntry.objects.all() if queryset is None else queryset
+    return (
+        queryset.values('user_id', 'user__username', 'leave_type_id', 'leave_type__name')
+        .annotate(
+            granted=Sum('days', filter=Q(kind__in=('GRANT', 'ACCRUAL')), default=0),
+            used=Sum('days', filter=Q(kind__in=('DEBIT', 'REVERSAL')), default=0) * -1,
+            expired=Sum('days', filter=Q(kind='EXPIRY'), default=0) * -1,
+            remaining=Sum('days'),
+        )
+        .order_by('user_id', 'leave_type_id')
+    )
+
+
+@transaction.atomic
+def rebuild_balances():
+    # Re-derives the cached totals of every balance that has ledger entries;
+    # returns how many had drifted.
+    totals = {(row['user_id'], row['leave_type_id']): row['remaining'] for row in ledger_totals()}
+    balances = _locked_balances(set(totals))
+    remaining = {key: max(totals[key], 0) for key in balances}
+    drifted = sum(1 for key, balance in balances.items() if remaining[key] != balance.remaining)
+    _set_remaining(balances, remaining)
+    return drifted
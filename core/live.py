@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from collections import namedtuple
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.template.loader import render_to_string
+
+# In-process pub/sub behind the live attendance dashboard. The rollup code
+# publishes every change to a day's summary; each open dashboard stream holds
+# a queue here. Messages are rendered once per change and shared by every
+# subscriber, so the cost of a check-in doesn't grow with the number of open
+# dashboards. Only streams served by the same process are reached: with
+# several workers the counts stay right, as each message carries the stored
+# totals, but a dashboard only names the check-ins its own process handled.
+
+LiveEvent = namedtuple('LiveEvent', 'date message')
+
+# Put on a subscriber's queue in place of the events it missed while full.
+RESYNC = LiveEvent(None, None)
+
+
+def sse_message(event, data):
+    lines = ''.join(f"data: {line}\n" for line in data.strip().splitlines() or [''])
+    return f"event: {event}\n{lines}\n".encode()
+
+
+def counts_message(summary):
+    return sse_message('counts', render_to_string('core/partials/attendance_counts.html', {'summary': summary}))
+
+
+class Subscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def _put(self, event):
+        # Runs on the subscriber's event loop.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client: drop what it hasn't read and send it a fresh
+            # snapshot instead once it catches up.
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self):
+        event = await self.queue.get()
+        if event is RESYNC:
+            self.overflowed = False
+        return event
+
+
+class Broker:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        # Call from the event loop that will read the subscription.
+        subscription = Subscription(asyncio.get_running_loop(), settings.LIVE_DASHBOARD_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, event):
+        # Safe from any thread; publishers are usually sync ORM code.
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # Its loop has closed without unsubscribing.
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def publish_summary(summary, checked_in=()):
+    # Called by core.rollups whenever a summary's counts change. Nothing is
+    # rendered or queried unless a dashboard is open in this process, and
+    # nothing is sent until the change commits.
+    if broker.has_subscribers():
+        transaction.on_commit(partial(
+            _publish, summary.date, summary.present_count, summary.absent_count, summary.total_users,
+            list(checked_in),
+        ))
+
+
+def _publish(date, present_count, absent_count, total_users, checked_in):
+    message = counts_message({
+        'present_count': present_count, 'absent_count': absent_count, 'total_users': total_users,
+    })
+    if checked_in:
+        # Bulk marks can move thousands of users; the feed names the first few.
+        shown = settings.LIVE_DASHBOARD_MAX_NAMES
+        usernames = User.objects.filter(pk__in=checked_in[:shown]).order_by('username').values_list(
+            'username', flat=True
+        )
+        message += sse_message('checkin', render_to_string('core/partials/attendance_checkins.html', {
+            'usernames': list(usernames), 'more': max(len(checked_in) - shown, 0),
+        }))
+    broker.publish(LiveEvent(date, message))
@@ -0,0 +1,72 @@
+import logging
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailDelivery
+
+logger = logging.getLogger(__name__)
+
+
+def queue_deliveries(kind, recipients, subject, body):
+    # `recipients` are users; those without an address are skipped.
+    return [row.pk for row in queue_messages(kind, [(user, subject, body) for user in recipients])]
+
+
+def queue_messages(kind, messages):
+    # `messages` are (user, subject, body) tuples, for mail that differs per recipient.
+    return EmailDelivery.objects.bulk_create([
+        EmailDelivery(kind=kind, recipient_id=user.pk, email=user.email, subject=subject, body=body)
+        for user, subject, body in messages
+        if user.email
+    ])
+
+
+def batched(ids, size):
+    ids = list(ids)
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def send_delivery_batch(delivery_ids, connection=None):
+    # Sends every still-pending delivery in the batch over one SMTP connection.
+    # A recipient the server refuses is marked FAILED and the batch carries on;
+    # connection-level errors propagate so the caller can retry, and only the
+    # rows that were not sent yet are picked up again.
+    deliveries = list(EmailDelivery.objects.filter(pk__in=delivery_ids, status='PENDING').order_by('pk'))
+    if not deliveries:
+        return 0
+    EmailDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(attempts=F('attempts') + 1)
+
+    connection = connection or get_connection(fail_silently=False)
+    sent, failed = [], []
+    try:
+        connection.open()
+        for delivery in deliveries:
+            message = EmailMessage(
+                subject=delivery.subject,
+                body=delivery.body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[delivery.email],
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as exc:
+                failed.append((delivery.pk, str(exc)))
+            else:
+                sent.append(delivery.pk)
+    finally:
+        connection.close()
+        if sent:
+            EmailDelivery.objects.filter(pk__in=sent).update(status='SENT', sent_at=timezone.now(), error='')
+        for pk, error in failed:
+            logger.warning("Delivery %s refused: %s", pk, error)
+            EmailDelivery.objects.filter(pk=pk).update(status='FAILED', error=error)
+    return len(sent)
+
+
+def mark_batch_failed(delivery_ids, error):
+    return EmailDelivery.objects.filter(pk__in=delivery_ids, status='PENDING').update(status='FAILED', error=error)
@@ -0,0 +1,52 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.accrual import run_accrual
+from core.models import LeaveType, LeaveBalance, LeaveLedgerEntry
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time a monthly accrual and a year-start roll-over over a synthetic workforce (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--leave-types', type=int, default=3)
+        parser.add_argument('--chunk', type=int, default=None, help="Users per checkpoint (default: ACCRUAL_CHUNK_SIZE).")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        began = time.perf_counter()
+        User.objects.bulk_create(
+            [User(username=f'accrual-bench-{i}') for i in range(options['users'])], batch_size=5000
+        )
+        LeaveType.objects.bulk_create(
+            [LeaveType(name=f'accrual-bench-{i}', annual_limit=12 + i * 6) for i in range(options['leave_types'])]
+        )
+        self.stdout.write(f"Seeded {options['users']} users in {time.perf_counter() - began:.1f}s")
+
+        # First run creates every balance; the second is a January roll-over that
+        # expires and refills them; the third re-runs January and must be a no-op.
+        for label, period in (('first accrual', date(2025, 12, 1)),
+                              ('year roll-over', date(2026, 1, 1)),
+                              ('re-run', date(2026, 1, 1))):
+            began = time.perf_counter()
+            run = run_accrual(period, chunk_size=options['chunk'])
+            self.stdout.write(
+                f"{label:>15}: {run.users} users in {time.perf_counter() - began:.2f}s "
+                f"({LeaveBalance.objects.count()} balances, {LeaveLedgerEntry.objects.count()} ledger rows)"
+            )
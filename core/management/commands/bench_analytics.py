@@ -0,0 +1,80 @@
+import random
+import time
+from datetime import datetime, time as clock, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import analytics
+from core.models import Attendance
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Seed a year of attendance (rolled back afterwards) and time the analytics fetch and computation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--teams', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                start, end = self.seed(options)
+                self.measure(start, end)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        began = time.perf_counter()
+        User.objects.bulk_create(
+            [User(username=f'analytics-bench-{i}') for i in range(options['users'])], batch_size=5000
+        )
+        user_ids = list(User.objects.filter(username__startswith='analytics-bench-').values_list('pk', flat=True))
+        groups = Group.objects.bulk_create([Group(name=f'analytics-bench-{i}') for i in range(options['teams'])])
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user_id, group_id=groups[i % len(groups)].pk)
+            for i, user_id in enumerate(user_ids)
+        ], batch_size=5000)
+
+        end = timezone.localdate()
+        start = end - timedelta(days=options['days'] - 1)
+        rng = random.Random(0)
+        table = Attendance._meta.db_table
+        sql = f"INSERT INTO {table} (user_id, date, status, marked_at) VALUES (%s, %s, %s, %s)"
+        rows = 0
+        calendar = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+        with connection.cursor() as cursor:
+            for day in calendar[np.is_busday(calendar)].tolist():
+                opens = datetime.combine(day, clock(8, 30), tzinfo=dt_timezone.utc)
+                batch = [
+                    (user_id, day, 'PRESENT',
+                     connection.ops.adapt_datetimefield_value(opens + timedelta(minutes=rng.randrange(120))))
+                    for user_id in user_ids
+                    if rng.random() < 0.93
+                ]
+                cursor.executemany(sql, batch)
+                rows += len(batch)
+        self.stdout.write(f"Seeded {rows} attendance rows for {len(user_ids)} users in {time.perf_counter() - began:.1f}s")
+        return start, end
+
+    def measure(self, start, end):
+        began = time.perf_counter()
+        attendance, leaves, users, teams = analytics.load_frames(start, end)
+        fetched = time.perf_counter()
+        report = analytics.compute_report(start, end, attendance, leaves, users, teams)
+        computed = time.perf_counter()
+
+        self.stdout.write(
+            f"fetch   {fetched - began:6.2f}s  ({len(attendance)} attendance rows, {len(users)} users)\n"
+            f"compute {computed - fetched:6.2f}s  ({report['business_days']} business days, "
+            f"{len(report['team_heatmap'])} teams)"
+        )
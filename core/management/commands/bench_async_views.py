@@ -0,0 +1,205 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Attendance, DailyAttendanceSummary
+
+# One employee's morning: check in, look at the history, glance at the summary.
+# The second round replays it, so "already marked" and warm caches are covered too.
+PATHS = ('mark_attendance', 'attendance_history', 'attendance_summary')
+EXPECTED_STATUS = {'mark_attendance': 302, 'attendance_history': 200, 'attendance_summary': 200}
+
+
+class PeakThreads:
+    # Samples the live thread count in the background while a run is going.
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the check-in views (mark_attendance, attendance_history, attendance_summary) through "
+        "Django's WSGI handler on a thread pool and through its ASGI handler on one event loop, under "
+        "the same concurrency, and report throughput, latency percentiles, peak threads and database "
+        "connections opened as JSON. Runs in-process against a throwaway database, so no server is needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Employees checking in.")
+        parser.add_argument('--rounds', type=int, default=2, help="Times each employee repeats the morning.")
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help="WSGI worker threads, and in-flight requests on the ASGI event loop.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        # A file database, so every worker thread sees the same data; no
+        # replica, which would still hold the real data; and DEBUG off, as in
+        # production, so queries aren't logged and errors aren't rendered.
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            DATABASE_REPLICA_ALIAS='', DEBUG=False, ALLOWED_HOSTS=['localhost'],
+        ):
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                report = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        User.objects.bulk_create([User(username=f'bench-{i:05d}') for i in range(options['users'])])
+        cookies = []
+        for user in User.objects.order_by('pk'):
+            client = Client()
+            client.force_login(user)
+            cookies.append(f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}")
+        requests = [(name, cookie) for _ in range(options['rounds']) for cookie in cookies for name in PATHS]
+        connection.close()  # the workers open their own
+
+        report = {'users': options['users'], 'requests': len(requests), 'concurrency': options['concurrency']}
+        for label, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+            self.reset()
+            report[label] = self.measure(label, run, requests, options['concurrency'])
+        return report
+
+    def reset(self):
+        # Both handlers start from the same state: nobody checked in, no cached fragments.
+        Attendance.objects.filter(date=timezone.localdate()).delete()
+        DailyAttendanceSummary.objects.all().delete()
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        caches['default'].clear()
+        connection.close()
+
+    def measure(self, label, run, requests, concurrency):
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count)
+        try:
+            with PeakThreads() as threads:
+                began = time.perf_counter()
+                results = run(requests, concurrency)
+                wall = time.perf_counter() - began
+        finally:
+            connection_created.disconnect(count)
+
+        errors = sum(1 for (name, _), (status, _) in zip(requests, results) if status != EXPECTED_STATUS[name])
+        ms = np.array([elapsed for _, elapsed in results]) * 1000
+        self.stderr.write(f"{label}: {len(results) / wall:8.1f} req/s  p50 {np.percentile(ms, 50):7.2f} ms  "
+                          f"p99 {np.percentile(ms, 99):7.2f} ms  {threads.peak} threads  {errors} errors")
+        return {
+            'seconds': round(wall, 2),
+            'requests_per_second': round(len(results) / wall, 1),
+            'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p90_ms': round(float(np.percentile(ms, 90)), 2),
+            'p99_ms': round(float(np.percentile(ms, 99)), 2),
+            'max_ms': round(float(ms.max()), 2),
+            'peak_threads': threads.peak,
+            'connections_opened': len(opened),
+            'errors': errors,
+        }
+
+    # -- WSGI: a thread per in-flight request, as gunicorn --threads would --
+
+    def run_wsgi(self, requests, concurrency):
+        handler = WSGIHandler()
+
+        def call(request):
+            name, cookie = request
+            statuses = []
+            environ = {
+                'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': reverse(name), 'QUERY_STRING': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            began = time.perf_counter()
+            response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return int(statuses[0].split()[0]), time.perf_counter() - began
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(call, requests))
+
+    # -- ASGI: one event loop with `concurrency` requests in flight, as uvicorn would --
+
+    def run_asgi(self, requests, concurrency):
+        handler = ASGIHandler()
+
+        async def call(request, slots):
+            name, cookie = request
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            response = {}
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.Future()  # the client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    response['status'] = message['status']
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': reverse(name), 'raw_path': reverse(name).encode(), 'query_string': b'',
+                'root_path': '', 'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            async with slots:
+                began = time.perf_counter()
+                await handler(scope, receive, send)
+                return response.get('status'), time.perf_counter() - began
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(call(request, slots) for request in requests))
+
+        return asyncio.run(main())
@@ -0,0 +1,121 @@
+import json
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection as db_connection
+
+from core.mailer import batched, send_delivery_batch
+from core.models import EmailDelivery
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP to accept and discard mail. `server.latency` is added to
+    # every reply to stand in for the round trip to a real relay.
+
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-sink\r\n250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), SinkHandler)
+        self.latency = latency
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+class Command(BaseCommand):
+    help = "Compare per-message SMTP sends with batched, parallel delivery against a local SMTP sink."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--batch', type=int, default=100, help="Recipients per connection.")
+        parser.add_argument('--workers', type=int, default=4, help="Parallel batches (stands in for Celery workers).")
+        parser.add_argument('--latency', type=float, default=2.0, help="Milliseconds added to every sink reply.")
+
+    def handle(self, *args, **options):
+        sink = SinkServer(options['latency'] / 1000)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        host, port = sink.server_address
+
+        def open_connection():
+            return get_connection(
+                SMTP_BACKEND, host=host, port=port, username='', password='',
+                use_tls=False, use_ssl=False, fail_silently=False,
+            )
+
+        try:
+            results = {
+                'per_message': self.per_message(open_connection, options['messages']),
+                'batched': self.batched(open_connection, options),
+            }
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+        for result in results.values():
+            result['messages_per_second'] = round(result['messages'] / result['seconds'], 1)
+        results['sink_received'] = sink.received
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def per_message(self, open_connection, count):
+        # What send_mail() in a loop does: a fresh connection for every message.
+        began = time.perf_counter()
+        for i in range(count):
+            EmailMessage('Benchmark', 'Benchmark body', 'bench@example.com', [f'user{i}@example.com'],
+                         connection=open_connection()).send()
+        return {'messages': count, 'seconds': round(time.perf_counter() - began, 3)}
+
+    def batched(self, open_connection, options):
+        rows = EmailDelivery.objects.bulk_create([
+            EmailDelivery(kind='benchmark', email=f'user{i}@example.com', subject='Benchmark', body='Benchmark body')
+            for i in range(options['messages'])
+        ])
+
+        def deliver(ids):
+            try:
+                return send_delivery_batch(ids, connection=open_connection())
+            finally:
+                db_connection.close()
+
+        try:
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                sent = sum(pool.map(deliver, batched([row.pk for row in rows], options['batch'])))
+            elapsed = time.perf_counter() - began
+        finally:
+            EmailDelivery.objects.filter(kind='benchmark').delete()
+        return {'messages': sent, 'seconds': round(elapsed, 3), 'batch': options['batch'], 'workers': options['workers']}
@@ -0,0 +1,104 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import LeaveRequest
+from core.services import leaves_on
+
+
+class Rollback(Exception):
+    pass
+
+
+OVERLAP_INDEXES = ('leave_employee_dates_idx', 'leave_status_dates_idx')
+
+
+class Command(BaseCommand):
+    help = "Seed a large leave table (rolled back afterwards) and time overlap checks and who-is-out lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000)
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--years', type=int, default=10, help="History the leaves are spread over.")
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--compare', action='store_true',
+                            help="Repeat the run with the overlap indexes dropped.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user_ids, today = self.seed(options)
+                self.report('with indexes', user_ids, today, options)
+                self.stdout.write("  who-is-out plan: " + leaves_on(today).explain().replace('\n', ' | '))
+                if options['compare']:
+                    # Plain DROP INDEX: it is rolled back with everything else (the
+                    # SQLite schema editor refuses to run inside a transaction).
+                    with connection.cursor() as cursor:
+                        for name in OVERLAP_INDEXES:
+                            cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+                    self.report('without indexes', user_ids, today, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        began = time.perf_counter()
+        User.objects.bulk_create(
+            [User(username=f'overlap-bench-{i}') for i in range(options['users'])], batch_size=5000
+        )
+        user_ids = list(User.objects.filter(username__startswith='overlap-bench-').values_list('pk', flat=True))
+        today = timezone.localdate()
+        span = options['years'] * 365
+        created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        statuses = ('APPROVED', 'APPROVED', 'APPROVED', 'REJECTED', 'PENDING')
+
+        rng = random.Random(0)
+        sql = (
+            "INSERT INTO core_leaverequest (employee_id, start_date, end_date, reason, status, created_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s)"
+        )
+        with connection.cursor() as cursor:
+            for offset in range(0, options['rows'], 50_000):
+                batch = []
+                for _ in range(min(50_000, options['rows'] - offset)):
+                    start = today - timedelta(days=rng.randrange(span))
+                    batch.append((
+                        rng.choice(user_ids), start, start + timedelta(days=rng.randrange(5)),
+                        'bench', rng.choice(statuses), created_at,
+                    ))
+                cursor.executemany(sql, batch)
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+            else:
+                cursor.execute('ANALYZE core_leaverequest')
+        self.stdout.write(f"Seeded {options['rows']} leaves for {len(user_ids)} users in {time.perf_counter() - began:.1f}s")
+        return user_ids, today
+
+    def report(self, label, user_ids, today, options):
+        rng = random.Random(1)
+        overlap, out = [], []
+        for _ in range(options['queries']):
+            start = today - timedelta(days=rng.randrange(30))
+            end = start + timedelta(days=rng.randrange(5))
+
+            began = time.perf_counter()
+            LeaveRequest.objects.filter(employee_id=rng.choice(user_ids)).active().overlapping(start, end).exists()
+            overlap.append(time.perf_counter() - began)
+
+            began = time.perf_counter()
+            list(leaves_on(start, end))
+            out.append(time.perf_counter() - began)
+
+        self.stdout.write(f"\n{label}")
+        for name, timings in (('overlap check', overlap), ('who is out', out)):
+            timings.sort()
+            self.stdout.write(
+                f"  {name:<14} p50 {statistics.median(timings) * 1000:8.2f} ms"
+                f"   p99 {timings[int(len(timings) * 0.99) - 1] * 1000:8.2f} ms"
+            )
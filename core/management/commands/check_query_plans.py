@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Attendance, LeaveRequest, LeaveLog
+from core.query_plans import hot_queries, uses_full_scan
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway dataset and assert the hot view queries are served by index scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help="Attendance rows to seed (0 checks the existing data instead).")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                if options['rows']:
+                    self.seed(options['rows'], options['batch_size'])
+                failures = self.check_plans()
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"Full table scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All hot queries use index scans."))
+
+    def seed(self, rows, batch_size):
+        days = 365
+        user_count = max(rows // days, 1)
+        self.stdout.write(f"Seeding {user_count} users x {days} days of attendance...")
+        users = User.objects.bulk_create(
+            [User(username=f'plan-user-{i}') for i in range(user_count)], batch_size=batch_size
+        )
+        today = timezone.localdate()
+
+        batch = []
+        for day in range(days):
+            date = today - timedelta(days=day)
+            for user in users:
+                batch.append(Attendance(user=user, date=date, status='PRESENT' if (user.pk + day) % 7 else 'ABSENT'))
+                if len(batch) >= batch_size:
+                    Attendance.objects.bulk_create(batch)
+                    batch = []
+        Attendance.objects.bulk_create(batch)
+
+        leaves = LeaveRequest.objects.bulk_create([
+            LeaveRequest(employee=users[i % user_count], start_date=today, end_date=today, reason='plan check')
+            for i in range(rows // 10)
+        ], batch_size=batch_size)
+        LeaveLog.objects.bulk_create([
+            LeaveLog(leave=leave, previous_status='PENDING', new_status='APPROVED') for leave in leaves
+        ], batch_size=batch_size)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def check_plans(self):
+        user_id = User.objects.values_list('pk', flat=True).first()
+        failures = []
+        for name, table, queryset in hot_queries(user_id, timezone.localdate()):
+            plan = queryset.explain()
+            full_scan = uses_full_scan(plan, table)
+            status = self.style.ERROR('FULL SCAN') if full_scan else self.style.SUCCESS('index')
+            self.stdout.write(f"{name:<20} {status}\n    {plan.replace(chr(10), chr(10) + '    ')}")
+            if full_scan:
+                failures.append(name)
+        return failures
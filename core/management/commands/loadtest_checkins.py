@@ -0,0 +1,101 @@
+import json
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import DeviceToken
+
+
+class Command(BaseCommand):
+    help = "Replay a burst of device check-ins against the ingestion endpoint and report events per second."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Full endpoint URL of a running server (default: in-process client).")
+        parser.add_argument('--token', help="Device token key (default: first active token).")
+        parser.add_argument('--events', type=int, default=20_000)
+        parser.add_argument('--batch', type=int, default=200, help="Events per request.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duplicates', type=float, default=0.05,
+                            help="Fraction of events that repeat an earlier check-in.")
+
+    def handle(self, *args, **options):
+        token = options['token'] or DeviceToken.objects.filter(is_active=True).values_list('key', flat=True).first()
+        if not token:
+            raise CommandError("No active device token; create one in the admin or pass --token.")
+        user_ids = list(User.objects.filter(is_active=True).values_list('pk', flat=True))
+        if not user_ids:
+            raise CommandError("No users to check in; run seed_demo_data first.")
+
+        bodies = self.build_requests(user_ids, options)
+        send = self.http_sender(options['url'], token) if options['url'] else self.client_sender(token)
+
+        totals = Counter()
+        latencies = []
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for summary, latency in pool.map(send, bodies):
+                totals.update(summary)
+                latencies.append(latency)
+        elapsed = time.perf_counter() - began
+
+        events = sum(totals.values())
+        latencies.sort()
+        self.stdout.write(json.dumps({
+            'events': events,
+            'requests': len(bodies),
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(events / elapsed, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+            'results': dict(totals),
+        }, indent=2))
+
+    def build_requests(self, user_ids, options):
+        # Each user checks in once per day, walking back a day whenever every
+        # user has been used, so only the injected repeats are duplicates.
+        today = timezone.localdate()
+        repeat_every = round(1 / options['duplicates']) if options['duplicates'] else 0
+        events = []
+        for i in range(options['events']):
+            if repeat_every and i and i % repeat_every == 0:
+                events.append(events[-1])
+                continue
+            day = today - timedelta(days=len(events) // len(user_ids))
+            user_id = user_ids[len(events) % len(user_ids)]
+            events.append(json.dumps({'user_id': user_id, 'date': day.isoformat()}))
+        size = options['batch']
+        return ['\n'.join(events[i:i + size]).encode() for i in range(0, len(events), size)]
+
+    def http_sender(self, url, token):
+        def send(body):
+            request = urllib.request.Request(url, data=body, method='POST', headers={
+                'Authorization': f'Token {token}',
+                'Content-Type': 'application/x-ndjson',
+            })
+            began = time.perf_counter()
+            with urllib.request.urlopen(request) as response:
+                summary = json.load(response)['summary']
+            return summary, time.perf_counter() - began
+        return send
+
+    def client_sender(self, token):
+        url = reverse('checkin_ingest')
+
+        def send(body):
+            began = time.perf_counter()
+            response = Client().post(
+                url, data=body, content_type='application/x-ndjson',
+                HTTP_AUTHORIZATION=f'Token {token}', HTTP_HOST='localhost',
+            )
+            if response.status_code != 200:
+                raise CommandError(f"Ingestion failed with HTTP {response.status_code}: {response.content[:200]!r}")
+            return response.json()['summary'], time.perf_counter() - began
+        return send
@@ -0,0 +1,109 @@
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmarks import SCENARIOS, prepare, query_budget
+from core.demo import seed_demo_data
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views and tasks and report latency percentiles, query counts and peak memory as JSON. "
+        "Fails when a scenario exceeds its query budget. Runs against freshly seeded demo data unless "
+        "--existing is given; either way every change is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help="Only run this scenario (repeatable).")
+        parser.add_argument('--existing', action='store_true', help="Benchmark the current data instead of seeding.")
+        parser.add_argument('--users', type=int, default=1000, help="Demo employees to seed.")
+        parser.add_argument('--days', type=int, default=90, help="Days of demo history to seed.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        scenarios = SCENARIOS
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in SCENARIOS}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in SCENARIOS if scenario.name in options['scenarios']]
+
+        report = {}
+        try:
+            with transaction.atomic():
+                if not options['existing']:
+                    began = time.perf_counter()
+                    report['seeded'] = seed_demo_data(users=options['users'], days=options['days'])
+                    report['seeded']['seconds'] = round(time.perf_counter() - began, 1)
+                data = prepare()
+                report['scenarios'] = {
+                    scenario.name: self.measure(scenario, data, options['iterations'], options['warmup'])
+                    for scenario in scenarios
+                }
+                raise Rollback
+        except Rollback:
+            pass
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        over = [f"{name} ({result['queries']} > {result['query_budget']})"
+                for name, result in report['scenarios'].items() if not result['within_budget']]
+        if over:
+            raise CommandError(f"Query budget exceeded: {', '.join(over)}")
+
+    def measure(self, scenario, data, iterations, warmup):
+        budget = query_budget(scenario, data)
+        if scenario.max_iterations:
+            iterations = min(iterations, scenario.max_iterations)
+            warmup = min(warmup, 1)
+        for _ in range(warmup):
+            scenario.run(data)
+
+        timings, queries = [], 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                began = time.perf_counter()
+                scenario.run(data)
+                timings.append(time.perf_counter() - began)
+            queries = max(queries, len(ctx.captured_queries))
+
+        # A separate traced run: tracemalloc slows allocation-heavy code too
+        # much to leave it on while timing.
+        tracemalloc.start()
+        try:
+            scenario.run(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        ms = np.array(timings) * 1000
+        self.stderr.write(f"{scenario.name:<28} p50 {np.percentile(ms, 50):9.2f} ms  {queries:>4} queries")
+        return {
+            'iterations': iterations,
+            'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p90_ms': round(float(np.percentile(ms, 90)), 2),
+            'p99_ms': round(float(np.percentile(ms, 99)), 2),
+            'max_ms': round(float(ms.max()), 2),
+            'mean_ms': round(float(ms.mean()), 2),
+            'queries': queries,
+            'query_budget': budget,
+            'within_budget': queries <= budget,
+            'peak_memory_kib': round(peak / 1024, 1),
+        }
@@ -0,0 +1,36 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import replica_alias
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into the replica file (DATABASE_REPLICA_NAME) with SQLite's "
+        "online backup API. Stands in for replication when trying the replica router locally."
+    )
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias == DEFAULT_DB_ALIAS:
+            raise CommandError("No replica configured; set DATABASE_REPLICA_NAME.")
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite' or connections[alias].vendor != 'sqlite':
+            raise CommandError("Only SQLite databases can be copied this way.")
+
+        # The replica's own connection may hold a read snapshot; drop it first.
+        connections[alias].close()
+        began = time.perf_counter()
+        primary.ensure_connection()
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {primary.settings_dict['NAME']} to {connections[alias].settings_dict['NAME']} "
+            f"in {time.perf_counter() - began:.2f}s"
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # Keep the most recent row for every (user, date) pair so the unique constraint can be added.
+    Attendance = apps.get_model('core', 'Attendance')
+    keep = Attendance.objects.values('user', 'date').annotate(keep_id=Max('id')).values('keep_id')
+    Attendance.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leavelog',
+            index=models.Index(fields=['changed_at'], name='leavelog_changed_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', 'status'], name='leave_employee_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
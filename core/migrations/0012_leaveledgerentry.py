@@ -0,0 +1,47 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # One opening grant per existing balance so the ledger sums to the cached totals.
+    LeaveBalance = apps.get_model('core', 'LeaveBalance')
+    LeaveLedgerEntry = apps.get_model('core', 'LeaveLedgerEntry')
+    LeaveLedgerEntry.objects.bulk_create([
+        LeaveLedgerEntry(
+            user_id=balance.user_id, leave_type_id=balance.leave_type_id,
+            kind='GRANT', days=balance.remaining, note='Opening balance',
+        )
+        for balance in LeaveBalance.objects.filter(remaining__gt=0).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notificationevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('GRANT', 'Grant'), ('DEBIT', 'Debit'), ('REVERSAL', 'Reversal')], max_length=10)),
+                ('days', models.IntegerField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.leaverequest')),
+                ('leave_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.leavetype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'leave_type'], name='ledger_user_type_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
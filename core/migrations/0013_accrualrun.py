@@ -0,0 +1,30 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_leaveledgerentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccrualRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('DONE', 'Done')], default='RUNNING', max_length=10)),
+                ('last_user_id', models.PositiveIntegerField(default=0)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='leaveledgerentry',
+            name='kind',
+            field=models.CharField(choices=[('GRANT', 'Grant'), ('ACCRUAL', 'Accrual'), ('DEBIT', 'Debit'), ('REVERSAL', 'Reversal'), ('EXPIRY', 'Expiry')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 15:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_attendance_on_leave'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='marked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,6 +1,19 @@
+import secrets
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+class LeaveRequestQuerySet(models.QuerySet):
+    def active(self):
+        # Requests that still hold their dates.
+        return self.filter(status__in=('PENDING', 'APPROVED'))
+
+    def overlapping(self, start, end):
+        # Inclusive ranges overlap when each starts on or before the other ends.
+        return self.filter(start_date__lte=end, end_date__gte=start)
+
+
 class LeaveRequest(models.Model):
     STATUS = (
         ('PENDING', 'Pending'),
@@ -15,20 +28,82 @@ class LeaveRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     leave_type = models.ForeignKey('core.LeaveType', on_delete=models.SET_NULL, null=True, blank=True)
 
+    objects = LeaveRequestQuerySet.as_manager()
+
+    # Field values remembered at load time so changes can be detected without re-fetching the row.
+    TRACKED_FIELDS = ('status',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'status'], name='leave_employee_status_idx'),
+            models.Index(fields=['created_at', 'id'], name='leave_created_id_idx'),
+            # Overlap checks for one employee, and company-wide "who is out";
+            # past leaves end before the day asked about, so the end_date range stays short.
+            models.Index(fields=['employee', 'start_date', 'end_date'], name='leave_employee_dates_idx'),
+            models.Index(fields=['status', 'end_date', 'start_date'], name='leave_status_dates_idx'),
+        ]
+
     def __str__(self):
         return f"{self.employee.username} | {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_tracked_fields()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_tracked_fields()
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        previous = getattr(self, '_loaded_values', {})
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._remember_tracked_fields()
+        if fields is not None:
+            # Only the reloaded fields get a new baseline.
+            self._loaded_values = {
+                **previous, **{field: value for field, value in self._loaded_values.items() if field in fields}
+            }
+
+    def _remember_tracked_fields(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field: getattr(self, field) for field in self.TRACKED_FIELDS if field not in deferred
+        }
+
+    def is_tracked(self, field):
+        return field in getattr(self, '_loaded_values', {})
+
+    def get_loaded_value(self, field):
+        return getattr(self, '_loaded_values', {}).get(field)
+
+    def has_changed(self, field):
+        return self.is_tracked(field) and self.get_loaded_value(field) != getattr(self, field)
+
 
 class Attendance(models.Model):
     STATUS_CHOICES = [
         ('PRESENT', 'Present'),
         ('ABSENT', 'Absent'),
+        ('ON_LEAVE', 'On Leave'),
     ]
+    # Written by the end-of-day backfill for anyone left unmarked; a later
+    # check-in for the same day replaces them.
+    BACKFILL_STATUSES = ('ABSENT', 'ON_LEAVE')
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
     status = models.CharField(max_length=10,choices=STATUS_CHOICES)
-    marked_at = models.DateTimeField(auto_now_add=True)
+    marked_at = models.DateTimeField(default=timezone.now)  # a device's own clock for check-ins
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_attendance_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} | {self.date} | {self.status}"
@@ -49,6 +124,11 @@ class LeaveLog(models.Model):
     new_status = models.CharField(max_length=10)
     changed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['changed_at'], name='leavelog_changed_at_idx'),
+        ]
+
     def __str__(self):
         return f"{self.leave.employee.username} | {self.previous_status} ➝ {self.new_status}"
 class LeaveType(models.Model):
@@ -58,6 +138,8 @@ class LeaveType(models.Model):
     def __str__(self):
         return self.name
 class LeaveBalance(models.Model):
+    # `remaining` is the running total of the user's LeaveLedgerEntry rows for
+    # this type, kept alongside the ledger so reads never have to sum it.
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
     remaining = models.PositiveIntegerField()
@@ -66,4 +148,149 @@ class LeaveBalance(models.Model):
         unique_together = ('user', 'leave_type')
 
     def __str__(self):
-        return f"{self.user.username} - {self.leave_type.name}: {self.remaining}"    
\ No newline at end of file
+        return f"{self.user.username} - {self.leave_type.name}: {self.remaining}"
+
+class LeaveLedgerEntry(models.Model):
+    # Append-only; grants are positive, debits negative and a reversal undoes a
+    # debit. Accruals and year-end expiries are written by core.accrual.
+    KIND = (
+        ('GRANT', 'Grant'),
+        ('ACCRUAL', 'Accrual'),
+        ('DEBIT', 'Debit'),
+        ('REVERSAL', 'Reversal'),
+        ('EXPIRY', 'Expiry'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
+    leave = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND)
+    days = models.IntegerField()
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'leave_type'], name='ledger_user_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} | {self.leave_type} | {self.kind} {self.days:+d}"
+
+
+class AccrualRun(models.Model):
+    # Checkpoint for one monthly accrual; users are processed in pk order and
+    # `last_user_id` is advanced in the same transaction as each chunk.
+    STATUS = (
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+    )
+    period = models.DateField(unique=True)  # first day of the month
+    status = models.CharField(max_length=10, choices=STATUS, default='RUNNING')
+    last_user_id = models.PositiveIntegerField(default=0)
+    users = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Accrual {self.period:%Y-%m} | {self.status}"
+
+
+class ExportJob(models.Model):
+    STATUS = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    )
+    KIND = (
+        ('attendance', 'Attendance'),
+        ('leave', 'Leave Requests'),
+        ('holiday', 'Holidays'),
+    )
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    kind = models.CharField(max_length=20, choices=KIND)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, default='PENDING')
+    file_path = models.CharField(max_length=255, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.pk} | {self.status}"
+
+
+def generate_device_key():
+    return secrets.token_hex(20)
+
+
+class DeviceToken(models.Model):
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=40, unique=True, default=generate_device_key)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class DailyAttendanceSummary(models.Model):
+    # Bitmaps are indexed by user id: bit n of the bytes is set when user n is in the set.
+    date = models.DateField(unique=True)
+    total_users = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    present_bitmap = models.BinaryField(default=b'')
+    absent_bitmap = models.BinaryField(default=b'')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date} | {self.present_count} present / {self.absent_count} absent"
+
+
+class EmailDelivery(models.Model):
+    STATUS = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+    kind = models.CharField(max_length=50)
+    recipient = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'status'], name='delivery_kind_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.email} | {self.status}"
+
+
+class NotificationEvent(models.Model):
+    # Outbox row written in the same transaction as the status change it
+    # describes; drained and coalesced into digests by a beat task.
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_events')
+    leave = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE)
+    previous_status = models.CharField(max_length=10)
+    new_status = models.CharField(max_length=10)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    delivery = models.ForeignKey(EmailDelivery, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='notification_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} | Leave #{self.leave_id}: {self.previous_status} → {self.new_status}"
@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .mailer import queue_messages
+from .models import NotificationEvent
+
+NOTIFY_STATUSES = ('APPROVED', 'REJECTED')
+
+
+def notification_events(rows, new_status):
+    # Outbox rows for decide_leaves(); `rows` are (pk, employee_id, ..., status) tuples.
+    return [
+        NotificationEvent(leave_id=row[0], recipient_id=row[1], previous_status=row[-1], new_status=new_status)
+        for row in rows
+    ]
+
+
+def record_leave_decision(leave, previous_status):
+    if leave.status in NOTIFY_STATUSES:
+        NotificationEvent.objects.create(
+            leave=leave,
+            recipient_id=leave.employee_id,
+            previous_status=previous_status,
+            new_status=leave.status,
+        )
+
+
+@transaction.atomic
+def build_digests(limit=None):
+    # Turns pending events into at most one EmailDelivery per recipient and
+    # returns the delivery ids. Several events for the same leave collapse into
+    # its latest status; a leave that ends up back where it started is dropped.
+    limit = limit or settings.NOTIFICATION_DRAIN_LIMIT
+    events = list(
+        NotificationEvent.objects.select_for_update(skip_locked=True, of=('self',))
+        .filter(processed_at__isnull=True)
+        .select_related('recipient', 'leave', 'leave__leave_type')
+        .order_by('pk')[:limit]
+    )
+    if not events:
+        return []
+
+    changes = defaultdict(dict)
+    for event in events:
+        first = changes[event.recipient].get(event.leave_id)
+        changes[event.recipient][event.leave_id] = {
+            'leave': event.leave,
+            'previous_status': first['previous_status'] if first else event.previous_status,
+            'new_status': event.new_status,
+        }
+
+    messages = []
+    for recipient, by_leave in changes.items():
+        leaves = [change for change in by_leave.values() if change['previous_status'] != change['new_status']]
+        if leaves:
+            messages.append((recipient, digest_subject(leaves), render_to_string(
+                'core/emails/leave_decisions.txt', {'recipient': recipient, 'changes': leaves}
+            )))
+    deliveries = queue_messages('leave_decision', messages)
+
+    delivery_for = {delivery.recipient_id: delivery.pk for delivery in deliveries}
+    processed_at = timezone.now()
+    for event in events:
+        event.processed_at = processed_at
+        event.delivery_id = delivery_for.get(event.recipient_id)
+    NotificationEvent.objects.bulk_update(events, ['processed_at', 'delivery'])
+    return [delivery.pk for delivery in deliveries]
+
+
+def digest_subject(changes):
+    if len(changes) == 1:
+        return f"Your leave request was {changes[0]['new_status'].lower()}"
+    return f"Updates on {len(changes)} of your leave requests"
@@ -0,0 +1,83 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render
+
+KeysetPage = namedtuple('KeysetPage', 'items next_cursor')
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_page(queryset, fields, cursor=None, page_size=50):
+    # Seek pagination in descending (fields...) order: the next page starts after
+    # the last row seen instead of at an OFFSET, so every page costs the same
+    # index range scan no matter how deep the reader scrolls. The last field
+    # must be unique (normally the primary key).
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(fields):
+            raise ValueError("Invalid cursor")
+        # Cursors come back from the client: coerce each value to its field's
+        # type so a tampered one is refused here rather than by the database.
+        try:
+            values = [queryset.model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, TypeError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        if None in values:
+            raise ValueError("Invalid cursor")
+        condition = Q()
+        for i in range(len(fields)):
+            step = Q(**{f'{fields[i]}__lt': values[i]})
+            for field, value in zip(fields[:i], values[:i]):
+                step &= Q(**{field: value})
+            condition |= step
+        queryset = queryset.filter(condition)
+
+    rows = list(queryset.order_by(*[f'-{field}' for field in fields])[:page_size + 1])
+    if len(rows) <= page_size:
+        return KeysetPage(rows, None)
+    rows = rows[:page_size]
+    return KeysetPage(rows, encode_cursor([getattr(rows[-1], field) for field in fields]))
+
+
+def keyset_response(request, queryset, fields, page_size, *, name, template, partial_template, serialize, context=None):
+    # A keyset-paginated list view: the page as JSON (?format=json), as rows for
+    # HTMX infinite scroll, or as the full page. The page's items go into the
+    # template context as `name`, with `next_url` pointing at the following page.
+    try:
+        page = keyset_page(queryset, fields, request.GET.get('cursor'), page_size)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [serialize(item) for item in page.items],
+            'next_cursor': page.next_cursor,
+        })
+
+    next_url = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_url = f"?{params.urlencode()}"
+
+    context = {**(context or {}), name: page.items, 'next_url': next_url}
+    return render(request, partial_template if request.htmx else template, context)
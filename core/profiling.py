@@ -0,0 +1,261 @@
+import cProfile
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# The profile of the request being served. Like the current user in
+# core.audit it is a context variable, so it follows the request into
+# sync_to_async threads, where the ORM actually runs under ASGI.
+_profile = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        self._template_depth = 0
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection as it opens (see core.signals), so it sees
+    # queries from middleware, views and templates alike.
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_time += time.perf_counter() - start
+        profile.queries += 1
+        profile.statements[sql] += 1
+
+
+# -------------------- Histograms --------------------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    # Cumulative Prometheus-style buckets per label value.
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label, value):
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = [[0] * len(self.buckets), 0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def lines(self, label_name):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for label, (counts, count, total) in sorted(self._series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f'{self.name}_bucket{{{label_name}="{label}",le="{bound}"}} {bucket_count}'
+            yield f'{self.name}_bucket{{{label_name}="{label}",le="+Inf"}} {count}'
+            yield f'{self.name}_sum{{{label_name}="{label}"}} {total}'
+            yield f'{self.name}_count{{{label_name}="{label}"}} {count}'
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = Histogram('view_request_seconds', 'Wall time per request.', LATENCY_BUCKETS)
+            self.queries = Histogram('view_db_queries', 'Database queries per request.', QUERY_BUCKETS)
+            self.db_time = Histogram('view_db_seconds', 'Time spent in the database per request.', LATENCY_BUCKETS)
+            self.template_time = Histogram(
+                'view_template_seconds', 'Time spent rendering templates per request.', LATENCY_BUCKETS
+            )
+            self.duplicates = Counter()
+
+    def observe(self, view, wall, profile, duplicated):
+        with self._lock:
+            self.latency.observe(view, wall)
+            self.queries.observe(view, profile.queries)
+            self.db_time.observe(view, profile.db_time)
+            self.template_time.observe(view, profile.template_time)
+            if duplicated:
+                self.duplicates[view] += 1
+
+    def render(self, extra_lines=()):
+        with self._lock:
+            lines = []
+            for histogram in (self.latency, self.queries, self.db_time, self.template_time):
+                lines.extend(histogram.lines('view'))
+            lines.append('# HELP view_duplicate_query_requests_total Requests that repeated one SQL statement '
+                         'at least PROFILING_DUPLICATE_QUERY_THRESHOLD times.')
+            lines.append('# TYPE view_duplicate_query_requests_total counter')
+            lines.extend(f'view_duplicate_query_requests_total{{view="{view}"}} {count}'
+                         for view, count in sorted(self.duplicates.items()))
+        lines.extend(extra_lines)
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+# -------------------- cProfile sampling --------------------
+
+class SlowestProfiles:
+    # Keeps the stats files of the `keep` slowest sampled requests on disk,
+    # deleting a file as soon as a slower request pushes it out.
+
+    def __init__(self):
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def offer(self, wall, view, profiler):
+        keep = settings.PROFILING_CPROFILE_KEEP
+        with self._lock:
+            if len(self._heap) >= keep and wall <= self._heap[0][0]:
+                return None
+            directory = settings.PROFILING_CPROFILE_DIR
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{wall * 1000:08.1f}ms-{view.replace(':', '-')}-{time.time_ns()}.prof")
+            profiler.dump_stats(path)
+            heapq.heappush(self._heap, (wall, path))
+            while len(self._heap) > keep:
+                _, evicted = heapq.heappop(self._heap)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+            return path
+
+
+slowest_profiles = SlowestProfiles()
+
+
+# -------------------- Middleware --------------------
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class ProfilingMiddleware:
+    # Times every request end to end and records per-view wall time, query
+    # count, database time and template time into the in-memory histograms
+    # served on /metrics. Requests that run the same SQL over and over
+    # (the usual N+1 signature) are logged and counted. With
+    # PROFILING_CPROFILE_SAMPLE_RATE > 0 that fraction of requests also runs
+    # under cProfile, and the slowest of them are dumped to disk.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token, profiler, start = self._begin()
+        try:
+            if profiler is not None:
+                response = profiler.runcall(self.get_response, request)
+            else:
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        self._finish(request, profile, profiler, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        # cProfile only follows the event loop thread, so async requests are never sampled.
+        profile, token, _, start = self._begin(sample=False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _profile.reset(token)
+        self._finish(request, profile, None, time.perf_counter() - start)
+        return response
+
+    def _begin(self, sample=True):
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        profiler = None
+        rate = settings.PROFILING_CPROFILE_SAMPLE_RATE
+        if sample and rate and random.random() < rate:
+            profiler = cProfile.Profile()
+        return profile, token, profiler, time.perf_counter()
+
+    def _finish(self, request, profile, profiler, wall):
+        view = view_label(request)
+        duplicates = profile.duplicates(settings.PROFILING_DUPLICATE_QUERY_THRESHOLD)
+        for sql, count in duplicates.items():
+            logger.warning("%s ran the same query %d times (possible N+1): %s", view, count, sql[:300])
+        metrics.observe(view, wall, profile, bool(duplicates))
+        if profiler is not None:
+            slowest_profiles.offer(wall, view, profiler)
+
+
+# -------------------- Template timing --------------------
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        profile = _profile.get()
+        if profile is None:
+            return self.template.render(context, request)
+        # render_to_string() inside a template tag or view helper nests; only
+        # the outermost render counts so the time isn't added twice.
+        profile._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            profile._template_depth -= 1
+            if not profile._template_depth:
+                profile.template_time += time.perf_counter() - start
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    # The stock Django template backend, with render time added to the
+    # current request's profile. {% include %} renders inside its parent, so
+    # it is already covered by the parent's time.
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,41 @@
+import re
+
+from django.db import connection
+
+from .models import Attendance, LeaveRequest, LeaveLog
+
+# The filters the attendance and leave views put on their biggest tables,
+# shared by `manage.py check_query_plans` and the query-plan tests. Each must be
+# served by an index; a full scan here is a regression that only shows once
+# the tables are large.
+
+
+def hot_queries(user_id, day):
+    return [
+        ('mark_attendance', 'core_attendance',
+         Attendance.objects.filter(user_id=user_id, date=day)),
+        ('attendance_history', 'core_attendance',
+         Attendance.objects.filter(user_id=user_id).order_by('-date')),
+        ('attendance_summary', 'core_attendance',
+         Attendance.objects.filter(date=day, status='PRESENT')),
+        ('leave_history', 'core_leaverequest',
+         LeaveRequest.objects.filter(employee_id=user_id)),
+        ('pending_leaves', 'core_leaverequest',
+         LeaveRequest.objects.filter(employee_id=user_id, status='PENDING')),
+        ('leave_overlap', 'core_leaverequest',
+         LeaveRequest.objects.filter(employee_id=user_id).active().overlapping(day, day)),
+        ('who_is_out', 'core_leaverequest',
+         LeaveRequest.objects.filter(status='APPROVED').overlapping(day, day)),
+        ('leave_logs', 'core_leavelog',
+         LeaveLog.objects.order_by('-changed_at')[:50]),
+    ]
+
+
+def uses_full_scan(plan, table):
+    if connection.vendor == 'sqlite':
+        # "SCAN t" is a full scan; "SCAN t USING INDEX i" walks an index in order.
+        return any(
+            re.search(rf'\bSCAN {table}\b', line) and 'USING' not in line
+            for line in plan.splitlines()
+        )
+    return f'Seq Scan on {table}' in plan
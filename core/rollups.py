@@ -0,0 +1,123 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .db import lock_for_write, read_from_primary
+from .live import publish_summary
+from .models import Attendance, DailyAttendanceSummary
+
+
+# -------------------- Bitmaps --------------------
+
+def ids_to_bitmap(ids):
+    ids = list(ids)
+    bitmap = bytearray((max(ids) >> 3) + 1 if ids else 0)
+    for user_id in ids:
+        bitmap[user_id >> 3] |= 1 << (user_id & 7)
+    return bytes(bitmap)
+
+
+def bitmap_to_ids(bitmap):
+    ids = []
+    for index, byte in enumerate(bytes(bitmap)):
+        while byte:
+            low = byte & -byte
+            ids.append((index << 3) + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+def _set_bits(bitmap, ids, value):
+    bitmap = bytearray(bitmap)
+    for user_id in ids:
+        index = user_id >> 3
+        if value:
+            if index >= len(bitmap):
+                bitmap.extend(bytes(index + 1 - len(bitmap)))
+            bitmap[index] |= 1 << (user_id & 7)
+        elif index < len(bitmap):
+            bitmap[index] &= ~(1 << (user_id & 7)) & 0xFF
+    return bytes(bitmap).rstrip(b'\x00')
+
+
+def _missing_bits(bitmap, ids):
+    bitmap = bytes(bitmap)
+    return [
+        user_id for user_id in ids
+        if (user_id >> 3) >= len(bitmap) or not bitmap[user_id >> 3] & (1 << (user_id & 7))
+    ]
+
+
+# -------------------- Summaries --------------------
+
+@read_from_primary()
+@transaction.atomic
+def build_daily_summary(date):
+    # Serialises concurrent first reads of a day, which would otherwise race
+    # to insert the same summary.
+    lock_for_write(DailyAttendanceSummary.objects.filter(date=date))
+    present = set(
+        Attendance.objects.filter(date=date, status='PRESENT').values_list('user_id', flat=True)
+    )
+    users = set(User.objects.filter(is_active=True).values_list('pk', flat=True))
+    summary, _ = DailyAttendanceSummary.objects.update_or_create(date=date, defaults={
+        'total_users': len(users | present),
+        'present_count': len(present),
+        'absent_count': len(users - present),
+        'present_bitmap': ids_to_bitmap(present),
+        'absent_bitmap': ids_to_bitmap(users - present),
+    })
+    publish_summary(summary)
+    return summary
+
+
+def get_daily_summary(date):
+    summary = DailyAttendanceSummary.objects.filter(date=date).first()
+    if summary is None:
+        # Under read_from_replica() it may just not have been replicated yet.
+        with read_from_primary():
+            summary = DailyAttendanceSummary.objects.filter(date=date).first()
+    return summary or build_daily_summary(date)
+
+
+async def aget_daily_summary(date):
+    # The common case, an existing summary, is one awaited query; misses go
+    # through get_daily_summary() in a thread.
+    summary = await DailyAttendanceSummary.objects.filter(date=date).afirst()
+    return summary or await sync_to_async(get_daily_summary)(date)
+
+
+@transaction.atomic
+def record_attendance(date, user_ids, status):
+    # Incrementally moves users between the present and absent sets of an
+    # existing summary; dates without a summary are built on first read.
+    lock_for_write(DailyAttendanceSummary.objects.filter(date=date))
+    summary = DailyAttendanceSummary.objects.select_for_update().filter(date=date).first()
+    if summary is None or not user_ids:
+        return
+    present = status == 'PRESENT'
+    checked_in = _missing_bits(summary.present_bitmap, user_ids) if present else ()
+    summary.present_bitmap = _set_bits(summary.present_bitmap, user_ids, present)
+    summary.absent_bitmap = _set_bits(summary.absent_bitmap, user_ids, not present)
+    _save_counts(summary)
+    publish_summary(summary, checked_in)
+
+
+@transaction.atomic
+def record_new_users(date, user_ids):
+    lock_for_write(DailyAttendanceSummary.objects.filter(date=date))
+    summary = DailyAttendanceSummary.objects.select_for_update().filter(date=date).first()
+    if summary is None:
+        return
+    summary.absent_bitmap = _set_bits(summary.absent_bitmap, user_ids, True)
+    _save_counts(summary)
+    publish_summary(summary)
+
+
+def _save_counts(summary):
+    present = int.from_bytes(bytes(summary.present_bitmap), 'little')
+    absent = int.from_bytes(bytes(summary.absent_bitmap), 'little')
+    summary.present_count = present.bit_count()
+    summary.absent_count = absent.bit_count()
+    summary.total_users = (present | absent).bit_count()
+    summary.save()
@@ -0,0 +1,138 @@
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, DateTimeField, OuterRef, Subquery, Value, When
+from django.utils import timezone
+
+from .models import LeaveRequest, Attendance, NotificationEvent
+from .audit import LeaveLogWriter
+from .db import lock_for_write
+from .workdays import working_days
+from .ledger import debit_leaves, reverse_leaves
+from .rollups import record_attendance
+from .dashboard_cache import bump_versions
+from .notifications import notification_events
+
+LEAVE_DECISIONS = ('APPROVED', 'REJECTED')
+
+
+LeaveDecision = namedtuple('LeaveDecision', 'decided insufficient')
+
+
+@transaction.atomic
+def decide_leaves(leaves, new_status, changed_by):
+    # `leaves` is a LeaveRequest queryset or an iterable of primary keys.
+    # Set-based approve/reject: one SELECT, bulk INSERTs for the logs, ledger
+    # entries and notification events, one UPDATE for the balances and one for
+    # the statuses, however many rows are selected. The status UPDATE bypasses
+    # the pre_save audit signal, which is why the log rows are written here.
+    # Approvals the balance can't cover stay pending and are returned as
+    # `insufficient`; rejecting an approved leave gives its days back.
+    if new_status not in LEAVE_DECISIONS:
+        raise ValueError(f"Invalid leave decision: {new_status}")
+
+    lock_for_write(LeaveRequest.objects.filter(pk__in=leaves))
+    rows = list(
+        LeaveRequest.objects.select_for_update()
+        .filter(pk__in=leaves)
+        .exclude(status=new_status)
+        .order_by('created_at', 'pk')
+        .values_list('pk', 'employee_id', 'leave_type_id', 'start_date', 'end_date', 'status')
+    )
+    insufficient = []
+    if new_status == 'APPROVED':
+        charged = [row for row in rows if row[2]]  # untyped leave has no balance to debit
+        if charged:
+            counts = working_days([row[3] for row in charged], [row[4] for row in charged])
+            insufficient = debit_leaves(
+                [(pk, employee_id, leave_type_id, int(count))
+                 for (pk, employee_id, leave_type_id, _, _, _), count in zip(charged, counts)],
+                created_by=changed_by,
+            )
+            refused = set(insufficient)
+            rows = [row for row in rows if row[0] not in refused]
+    else:
+        reverse_leaves([row[0] for row in rows if row[5] == 'APPROVED'], created_by=changed_by)
+
+    if not rows:
+        return LeaveDecision(0, insufficient)
+
+    with LeaveLogWriter() as writer:
+        for pk, _, _, _, _, status in rows:
+            writer.add(pk, status, new_status, changed_by)
+    # Employees hear about it from the notification drainer, after commit.
+    NotificationEvent.objects.bulk_create(notification_events(rows, new_status))
+
+    LeaveRequest.objects.filter(pk__in=[row[0] for row in rows]).update(status=new_status)
+    bump_versions('leave_history', [row[1] for row in rows])
+    return LeaveDecision(len(rows), insufficient)
+
+
+def leaves_on(start, end=None, include_pending=False):
+    # Everyone whose leave touches [start, end], company-wide, in one indexed query.
+    leaves = LeaveRequest.objects.active() if include_pending else LeaveRequest.objects.filter(status='APPROVED')
+    return (
+        leaves.overlapping(start, end or start)
+        .select_related('employee', 'leave_type')
+        .order_by('start_date', 'pk')
+    )
+
+
+AttendanceResult = namedtuple('AttendanceResult', 'created updated skipped unknown')
+
+
+@transaction.atomic
+def mark_attendance_bulk(user_ids, date, status='PRESENT', overwrite=True, marked_at=None):
+    # Marks any number of users for `date` with one lookup query and one upsert
+    # keyed on the (user, date) unique constraint. With overwrite=False rows that
+    # already exist are left alone and reported as skipped, except absences
+    # written by the end-of-day backfill, which a presence mark replaces.
+    # `marked_at` maps user ids to when they were actually marked (a device's
+    # check-in time); anyone not in it is marked now.
+    if status not in dict(Attendance.STATUS_CHOICES):
+        raise ValueError(f"Invalid attendance status: {status}")
+    now = timezone.now()
+    marked_at = marked_at or {}
+
+    requested = {int(user_id) for user_id in user_ids}
+    marked = dict(
+        User.objects.filter(pk__in=requested)
+        .annotate(marked=Subquery(Attendance.objects.filter(user=OuterRef('pk'), date=date).values('status')[:1]))
+        .values_list('pk', 'marked')
+    )
+    unknown = sorted(requested - marked.keys())
+    existing = sorted(pk for pk, marked_status in marked.items() if marked_status is not None)
+    new = sorted(pk for pk, marked_status in marked.items() if marked_status is None)
+
+    if overwrite:
+        to_write = new + existing
+        Attendance.objects.bulk_create(
+            [Attendance(user_id=pk, date=date, status=status, marked_at=marked_at.get(pk, now)) for pk in to_write],
+            update_conflicts=True, unique_fields=['user', 'date'], update_fields=['status'],
+        )
+        result = AttendanceResult(created=new, updated=existing, skipped=[], unknown=unknown)
+    else:
+        replaced = []
+        if status not in Attendance.BACKFILL_STATUSES:
+            replaced = [pk for pk in existing if marked[pk] in Attendance.BACKFILL_STATUSES]
+        # A concurrent writer may have marked someone since the lookup; let the constraint decide.
+        Attendance.objects.bulk_create(
+            [Attendance(user_id=pk, date=date, status=status, marked_at=marked_at.get(pk, now)) for pk in new],
+            ignore_conflicts=True,
+        )
+        if replaced:
+            Attendance.objects.filter(
+                user_id__in=replaced, date=date, status__in=Attendance.BACKFILL_STATUSES
+            ).update(status=status, marked_at=Case(
+                *[When(user_id=pk, then=Value(marked_at[pk])) for pk in replaced if pk in marked_at],
+                default=Value(now), output_field=DateTimeField(),
+            ))
+        to_write = new + replaced
+        skipped = sorted(set(existing) - set(replaced))
+        result = AttendanceResult(created=new, updated=replaced, skipped=skipped, unknown=unknown)
+
+    # bulk_create() sends no post_save, so update the rollup and history caches here.
+    record_attendance(date, to_write, status)
+    bump_versions('attendance_history', to_write)
+    return result
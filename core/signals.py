@@ -1,31 +1,86 @@
-from django.db.models.signals import pre_save
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import LeaveRequest, LeaveLog
-from threading import local
-
-# Thread-local to store user in request
-_user = local()
-
-def set_current_user(user):
-    _user.value = user
-
-def get_current_user():
-    return getattr(_user, 'value', None)
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import LeaveRequest, Holiday, Attendance
+from .audit import get_current_user, write_leave_log
+from .holidays import invalidate_holiday_calendar
+from .rollups import record_attendance, record_new_users
+from .dashboard_cache import bump_versions
+from .notifications import record_leave_decision
+from .profiling import record_query
+from .db import apply_sqlite_pragmas
 
 @receiver(pre_save, sender=LeaveRequest)
-def log_leave_status_change(sender, instance, **kwargs):
-    if not instance.pk:
-        return  # It's a new leave, not an update
+def log_leave_status_change(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or not instance.pk:
+        return  # It's a new leave (or a fixture load), not an update
 
-    try:
-        old = LeaveRequest.objects.get(pk=instance.pk)
-    except LeaveRequest.DoesNotExist:
-        return
+    if instance.is_tracked('status'):
+        previous_status = instance.get_loaded_value('status')
+    else:
+        # Built by hand rather than loaded from the database; fall back to a lookup.
+        previous_status = LeaveRequest.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
 
-    if old.status != instance.status:
-        LeaveLog.objects.create(
+    if previous_status is not None and previous_status != instance.status:
+        write_leave_log(
             leave=instance,
-            previous_status=old.status,
+            previous_status=previous_status,
             new_status=instance.status,
-            changed_by=get_current_user()
+            changed_by=get_current_user(),
         )
+        record_leave_decision(instance, previous_status)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def refresh_holiday_calendar(sender, **kwargs):
+    # After commit, or another worker could reload the old rows under the new version.
+    transaction.on_commit(invalidate_holiday_calendar)
+
+
+# Keep the daily attendance rollup in step with single-row writes; the bulk
+# attendance service updates it directly.
+@receiver(post_save, sender=Attendance)
+def update_attendance_rollup(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_attendance(instance.date, [instance.user_id], instance.status)
+
+
+@receiver(post_delete, sender=Attendance)
+def remove_from_attendance_rollup(sender, instance, **kwargs):
+    record_attendance(instance.date, [instance.user_id], 'ABSENT')
+
+
+@receiver(post_save, sender=User)
+def add_user_to_attendance_rollup(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.is_active:
+        record_new_users(timezone.localdate(), [instance.pk])
+
+
+# Per-user history fragments are cached; any write to the underlying rows
+# retires the cached copy. Bulk services bump the versions themselves.
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def expire_leave_history(sender, instance, **kwargs):
+    bump_versions('leave_history', [instance.employee_id])
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def expire_attendance_history(sender, instance, **kwargs):
+    bump_versions('attendance_history', [instance.user_id])
+
+
+# Per-request query counting for core.profiling; a reconnect reuses the wrapper object.
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    apply_sqlite_pragmas(connection)
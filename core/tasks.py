@@ -1,26 +1,125 @@
-from celery import shared_task
-from django.core.mail import send_mail
+import smtplib
+
+from celery import group, shared_task
 from django.contrib.auth.models import User
-from .models import Holiday
+from .models import ExportJob
+from .holidays import get_holiday_calendar
+from .exports import build_pdf_export
+from .db import read_from_replica
+from .rollups import build_daily_summary
+from .archive import archive_cutoff, archive_leave_logs
+from .notifications import build_digests
+from .accrual import run_accrual
+from .absences import backfill_absences
+from .mailer import batched, mark_batch_failed, queue_deliveries, send_delivery_batch
+from django.conf import settings
 from django.utils import timezone
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+
+def beat_localdate():
+    # Today where beat fires its crontabs (CELERY_TIMEZONE), which is not the
+    # TIME_ZONE that timezone.localdate() uses: 00:30 IST is still yesterday in UTC.
+    return timezone.localdate(timezone=ZoneInfo(settings.CELERY_TIMEZONE))
+
 
 @shared_task
 def send_attendance_reminder():
     today = timezone.localdate()
     
     # Check if today is a holiday
-    if Holiday.objects.filter(date=today).exists():
+    if get_holiday_calendar().is_holiday(today):
         return 'Skipped – Today is a holiday'
 
     # Get all admin users
-    admins = User.objects.filter(is_staff=True, is_superuser=True)
-    
-    for admin in admins:
-        send_mail(
-            subject='Attendance Reminder',
-            message='Please mark the attendance for today.',
-            from_email='admin@company.com',
-            recipient_list=[admin.email],
-            fail_silently=False,
-        )
-    return f"Sent to {admins.count()} admins"
\ No newline at end of file
+    admins = User.objects.filter(is_staff=True, is_superuser=True).only('pk', 'email')
+
+    delivery_ids = queue_deliveries(
+        'attendance_reminder',
+        admins,
+        subject='Attendance Reminder',
+        body='Please mark the attendance for today.',
+    )
+    batches = dispatch_deliveries(delivery_ids)
+    return f"Queued {len(delivery_ids)} reminders in {batches} batches"
+
+
+def dispatch_deliveries(delivery_ids):
+    # One subtask per batch; each batch shares a single SMTP connection.
+    batches = batched(delivery_ids, settings.EMAIL_BATCH_SIZE)
+    if batches:
+        group(deliver_email_batch.s(batch) for batch in batches).apply_async()
+    return len(batches)
+
+
+@shared_task(bind=True, max_retries=settings.EMAIL_DELIVERY_MAX_RETRIES)
+def deliver_email_batch(self, delivery_ids):
+    try:
+        return send_delivery_batch(delivery_ids)
+    except (smtplib.SMTPException, OSError) as exc:
+        if self.request.retries >= self.max_retries:
+            mark_batch_failed(delivery_ids, str(exc))
+            raise
+        # Exponential backoff: 30s, 60s, 120s, ...
+        raise self.retry(exc=exc, countdown=settings.EMAIL_RETRY_BACKOFF * 2 ** self.request.retries)
+
+
+@shared_task
+def generate_pdf_export(job_id):
+    job = ExportJob.objects.get(pk=job_id)
+    job.status = 'RUNNING'
+    job.save(update_fields=['status'])
+
+    try:
+        with read_from_replica():
+            job.file_path, job.rows = build_pdf_export(job)
+    except Exception as exc:
+        job.status = 'FAILED'
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    job.status = 'DONE'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file_path', 'rows', 'finished_at'])
+    return job.file_path
+
+
+@shared_task
+def backfill_absent_attendance(day=None):
+    # Shortly after midnight, for the day that just ended.
+    day = date.fromisoformat(day) if day else beat_localdate() - timedelta(days=1)
+    result = backfill_absences(day)
+    return f"Backfilled {day}: {len(result.absent)} absent, {len(result.on_leave)} on leave"
+
+
+@shared_task
+def rebuild_attendance_summaries(days=7):
+    # Nightly safety net for the incrementally maintained rollup.
+    today = timezone.localdate()
+    for offset in range(days):
+        build_daily_summary(today - timedelta(days=offset))
+    return f"Rebuilt {days} daily summaries"
+
+
+@shared_task
+def archive_old_leave_logs(months=None):
+    months = settings.LEAVE_LOG_RETENTION_MONTHS if months is None else months
+    count = archive_leave_logs(archive_cutoff(months))
+    return f"Archived {count} leave logs"
+
+
+@shared_task
+def drain_leave_notifications():
+    # Runs every minute, so a bulk approval reaches each employee as one digest.
+    delivery_ids = build_digests()
+    batches = dispatch_deliveries(delivery_ids)
+    return f"Queued {len(delivery_ids)} leave digests in {batches} batches"
+
+
+@shared_task
+def accrue_leave_balances(period=None):
+    # Monthly, on the 1st; January runs also expire the previous year's balances.
+    run = run_accrual(date.fromisoformat(period) if period else beat_localdate())
+    return f"Accrual {run.period:%Y-%m}: {run.users} users, {run.status}"
@@ -1,3 +1,1188 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import smtplib
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from celery.exceptions import Retry
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import DatabaseError, connection, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from . import dashboard_cache, live, profiling, services, views
+from .absences import backfill_absences
+from .analytics import attendance_report
+from .archive import archive_leave_logs, read_archive
+from .checkins import CheckinQueue, PendingBatch
+from .benchmarks import SCENARIOS, prepare, query_budget
+from .db import read_from_primary, read_from_replica, replica_alias
+from .demo import seed_demo_data
+from .holidays import get_holiday_calendar, invalidate_holiday_calendar
+from .ledger import grant_leave, ledger_totals, rebuild_balances
+from .mailer import batched, queue_deliveries, send_delivery_batch
+from .models import (
+    AccrualRun, Attendance, DailyAttendanceSummary, DeviceToken, EmailDelivery, ExportJob, Holiday, LeaveBalance,
+    LeaveLedgerEntry, LeaveLog, LeaveRequest, LeaveType, NotificationEvent,
+)
+from .notifications import build_digests
+from .pagination import encode_cursor
+from .query_plans import hot_queries, uses_full_scan
+from .rollups import bitmap_to_ids, build_daily_summary, ids_to_bitmap
+from .services import decide_leaves, leaves_on, mark_attendance_bulk
+from .tasks import accrue_leave_balances, backfill_absent_attendance, deliver_email_batch, generate_pdf_export
+
+
+class QueryBudgetTests(TestCase):
+    # Runs every benchmark scenario (see core.benchmarks) against a small demo
+    # company. Each page holds more rows than a couple of queries' worth, so a
+    # query per row shows up as a blown budget.
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_demo_data(users=60, days=20, teams=4)
+
+    def test_scenarios_stay_within_query_budget(self):
+        data = prepare(self.client)
+        for scenario in SCENARIOS:
+            with self.subTest(scenario=scenario.name):
+                scenario.run(data)  # first run builds what later requests reuse (rollups, caches)
+                with CaptureQueriesContext(connection) as ctx:
+                    scenario.run(data)
+                self.assertLessEqual(
+                    len(ctx.captured_queries), query_budget(scenario, data),
+                    '\n'.join(query['sql'] for query in ctx.captured_queries),
+                )
+
+
+class QueryPlanTests(TestCase):
+    # The hot view queries (see core.query_plans) must stay on their indexes.
+    # Statistics are gathered so the planner judges the seeded tables as it
+    # would production ones rather than as empty.
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_demo_data(users=60, days=20, teams=4)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_queries_use_indexes(self):
+        user_id = User.objects.filter(is_staff=False).values_list('pk', flat=True).first()
+        day = Attendance.objects.order_by('-date').values_list('date', flat=True).first()
+        for name, table, queryset in hot_queries(user_id, day):
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                self.assertFalse(uses_full_scan(plan, table), plan)
+
+
+class LeaveStatusTrackingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.leave = LeaveRequest.objects.create(
+            employee=User.objects.create_user('emp'), start_date=date(2025, 3, 3), end_date=date(2025, 3, 4),
+            reason='Trip',
+        )
+
+    def test_refresh_from_db_resets_the_baseline(self):
+        decide_leaves([self.leave.pk], 'APPROVED', self.admin)
+        self.leave.refresh_from_db()
+        self.leave.reason = 'Family trip'
+        self.leave.save()
+        self.assertEqual(LeaveLog.objects.filter(leave=self.leave).count(), 1)
+        self.assertEqual(NotificationEvent.objects.filter(leave=self.leave).count(), 1)
+
+    def test_refresh_of_other_fields_keeps_the_status_baseline(self):
+        self.leave.status = 'REJECTED'
+        self.leave.refresh_from_db(fields=['reason'])
+        self.assertTrue(self.leave.has_changed('status'))
+        self.leave.save()
+        self.assertEqual(
+            list(LeaveLog.objects.filter(leave=self.leave).values_list('previous_status', 'new_status')),
+            [('PENDING', 'REJECTED')],
+        )
+
+
+class DashboardCacheVersionTests(TestCase):
+    def test_versions_are_bumped_only_after_commit(self):
+        user = User.objects.create_user('emp')
+        before = dashboard_cache.get_version('attendance_history', user.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Attendance.objects.create(user=user, date=date(2025, 3, 3), status='PRESENT')
+            self.assertEqual(dashboard_cache.get_version('attendance_history', user.pk), before)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(dashboard_cache.get_version('attendance_history', user.pk), before)
+
+
+class HolidayCalendarTests(TestCase):
+    def setUp(self):
+        invalidate_holiday_calendar()  # the cache outlives each test's rolled-back rows
+
+    def test_calendar_is_invalidated_only_after_commit(self):
+        get_holiday_calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(name='Founders Day', date=date(2025, 3, 5))
+            self.assertNotIn(date(2025, 3, 5), get_holiday_calendar())
+        self.assertIn(date(2025, 3, 5), get_holiday_calendar())
+
+
+class LeaveAccrualTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('emp')
+        self.casual = LeaveType.objects.create(name='Casual', annual_limit=12)
+        LeaveBalance.objects.create(user=self.user, leave_type=self.casual, remaining=5)
+
+    def test_january_run_from_beat_resets_the_new_year(self):
+        # Beat fires at 00:30 IST on 1 January, still 31 December in UTC.
+        fired_at = datetime(2024, 12, 31, 19, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=fired_at):
+            accrue_leave_balances()
+
+        self.assertEqual(AccrualRun.objects.get().period, date(2025, 1, 1))
+        self.assertEqual(LeaveBalance.objects.get(user=self.user, leave_type=self.casual).remaining, 1)
+        self.assertEqual(
+            sorted(LeaveLedgerEntry.objects.filter(user=self.user).values_list('kind', 'days')),
+            [('ACCRUAL', 1), ('EXPIRY', -5)],
+        )
+
+    def test_rerunning_a_finished_period_changes_nothing(self):
+        accrue_leave_balances('2025-02-01')
+        accrue_leave_balances('2025-02-01')
+        self.assertEqual(LeaveBalance.objects.get(user=self.user, leave_type=self.casual).remaining, 6)
+        self.assertEqual(LeaveLedgerEntry.objects.filter(user=self.user).count(), 1)
+
+
+class AbsenceBackfillTests(TestCase):
+    # 2025-03-05 is a Wednesday.
+    day = date(2025, 3, 5)
+
+    def setUp(self):
+        invalidate_holiday_calendar()
+        joined = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.present, self.absent, self.away = [
+            User.objects.create_user(username, date_joined=joined) for username in ('present', 'absent', 'away')
+        ]
+        Attendance.objects.create(user=self.present, date=self.day, status='PRESENT')
+        LeaveRequest.objects.create(
+            employee=self.away, start_date=date(2025, 3, 4), end_date=date(2025, 3, 6), reason='Trip',
+            status='APPROVED',
+        )
+
+    def statuses(self, day):
+        return dict(Attendance.objects.filter(date=day).values_list('user__username', 'status'))
+
+    def test_unmarked_users_are_absent_or_on_leave(self):
+        result = backfill_absences(self.day)
+        self.assertEqual((result.absent, result.on_leave), ([self.absent.pk], [self.away.pk]))
+        self.assertEqual(self.statuses(self.day), {'present': 'PRESENT', 'absent': 'ABSENT', 'away': 'ON_LEAVE'})
+
+    def test_weekends_and_holidays_are_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(name='Founders Day', date=self.day)
+        self.assertEqual(backfill_absences(self.day), ([], []))
+        self.assertEqual(backfill_absences(date(2025, 3, 8)), ([], []))
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_rerunning_a_day_writes_nothing_new(self):
+        backfill_absences(self.day)
+        self.assertEqual(backfill_absences(self.day), ([], []))
+        self.assertEqual(Attendance.objects.filter(date=self.day).count(), 3)
+
+    def test_late_check_in_replaces_the_backfilled_row(self):
+        backfill_absences(self.day)
+        result = mark_attendance_bulk([self.absent.pk, self.present.pk], self.day, 'PRESENT', overwrite=False)
+        self.assertEqual((result.updated, result.skipped), ([self.absent.pk], [self.present.pk]))
+        self.assertEqual(self.statuses(self.day)['absent'], 'PRESENT')
+
+    def test_task_backfills_yesterday_in_the_beat_timezone(self):
+        # Beat fires at 00:15 IST on 6 March, still 5 March in UTC.
+        fired_at = datetime(2025, 3, 5, 18, 45, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=fired_at):
+            backfill_absent_attendance()
+        self.assertEqual(self.statuses(self.day)['absent'], 'ABSENT')
+        self.assertFalse(Attendance.objects.filter(date=date(2025, 3, 4)).exists())
+
+
+@override_settings(CHECKIN_QUEUE_ENABLED=False)
+class CheckinIngestTests(TestCase):
+    def setUp(self):
+        invalidate_holiday_calendar()
+        self.user = User.objects.create_user('emp')
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {DeviceToken.objects.create(name="Gate").key}'}
+
+    def post(self, body):
+        return self.client.post(reverse('checkin_ingest'), body, content_type='application/x-ndjson', **self.headers)
+
+    def test_device_timestamp_is_stored_as_marked_at(self):
+        response = self.post(f'{{"user_id": {self.user.pk}, "timestamp": "2025-03-05T09:01:12+05:30"}}\n')
+        self.assertEqual(response.json()['results'], ['accepted'])
+        self.assertEqual(
+            Attendance.objects.get(user=self.user, date=date(2025, 3, 5)).marked_at,
+            datetime(2025, 3, 5, 3, 31, 12, tzinfo=dt_timezone.utc),
+        )
+
+    def test_late_upload_replacing_a_backfilled_row_keeps_the_device_time(self):
+        Attendance.objects.create(user=self.user, date=date(2025, 3, 5), status='ABSENT')
+        response = self.post(f'{{"user_id": {self.user.pk}, "timestamp": "2025-03-05T09:01:12+05:30"}}\n')
+        self.assertEqual(response.json()['results'], ['accepted'])
+        record = Attendance.objects.get(user=self.user, date=date(2025, 3, 5))
+        self.assertEqual(
+            (record.status, record.marked_at), ('PRESENT', datetime(2025, 3, 5, 3, 31, 12, tzinfo=dt_timezone.utc))
+        )
+
+    def test_non_utf8_body_is_rejected(self):
+        self.assertEqual(self.post(b'\xff\xfe{"user_id": 1}\n').status_code, 400)
+
+    def test_out_of_range_user_id_is_an_invalid_event(self):
+        response = self.post(
+            f'{{"user_id": 1e23, "date": "2025-03-05"}}\n{{"user_id": {self.user.pk}, "date": "2025-03-05"}}\n'
+        )
+        self.assertEqual(response.json()['results'], ['invalid', 'accepted'])
+
+    def test_a_failing_batch_does_not_fail_the_others_in_its_flush(self):
+        good = PendingBatch([{'user_id': self.user.pk, 'date': date(2025, 3, 5), 'marked_at': None}])
+        bad = PendingBatch([{'user_id': 10 ** 30, 'date': date(2025, 3, 5), 'marked_at': None}])
+        with mock.patch('core.checkins.close_old_connections'), self.assertLogs('core.checkins', 'ERROR'):
+            CheckinQueue(max_events=10, max_wait=0)._flush([bad, good])
+        self.assertEqual(good.wait(0), ['accepted'])
+        with self.assertRaises(OverflowError):
+            bad.wait(0)
+        self.assertTrue(Attendance.objects.filter(user=self.user, date=date(2025, 3, 5)).exists())
+
+
+class AttendanceBatchTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.users = [User.objects.create_user(f'emp{i}') for i in range(2)]
+
+    def post(self, payload):
+        return self.client.post(reverse('attendance_batch'), payload, content_type='application/json')
+
+    def test_marks_the_listed_users(self):
+        response = self.post({'user_ids': [user.pk for user in self.users], 'date': '2025-03-05'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Attendance.objects.filter(date=date(2025, 3, 5)).count(), 2)
+
+    def test_rejects_user_ids_that_are_not_a_list_of_ints(self):
+        for user_ids in (f'{self.users[0].pk}{self.users[1].pk}', [str(self.users[0].pk)], [True], 7, None):
+            with self.subTest(user_ids=user_ids):
+                self.assertEqual(self.post({'user_ids': user_ids, 'date': '2025-03-05'}).status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class LeavePreviewTests(TestCase):
+    def setUp(self):
+        invalidate_holiday_calendar()
+        self.user = User.objects.create_user('emp')
+        self.client.force_login(self.user)
+
+    def test_charges_working_days_against_the_balance(self):
+        casual = LeaveType.objects.create(name='Casual')
+        LeaveBalance.objects.create(user=self.user, leave_type=casual, remaining=5)
+        response = self.client.get(reverse('leave_preview'), {
+            'start_date': '2025-03-07', 'end_date': '2025-03-10', 'leave_type': casual.pk,
+        })
+        self.assertEqual((response.context['days'], response.context['remaining_after']), (2, 3))
+
+    def test_malformed_input_renders_an_empty_fragment(self):
+        bad_type = {'start_date': '2025-03-07', 'end_date': '2025-03-10', 'leave_type': 'abc'}
+        for params in ({'start_date': 'soon'}, bad_type):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('leave_preview'), params)
+                self.assertEqual((response.status_code, response.content), (200, b''))
+
+
+class LeaveLedgerTests(TestCase):
+    # 2025-03-10 is a Monday.
+
+    def setUp(self):
+        invalidate_holiday_calendar()
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.user = User.objects.create_user('emp')
+        self.casual = LeaveType.objects.create(name='Casual')
+        grant_leave(self.user, self.casual, 5, created_by=self.admin)
+
+    def request_leave(self, start, end):
+        return LeaveRequest.objects.create(
+            employee=self.user, leave_type=self.casual, start_date=start, end_date=end, reason='Trip'
+        )
+
+    def remaining(self):
+        return LeaveBalance.objects.get(user=self.user, leave_type=self.casual).remaining
+
+    def test_approval_debits_working_days(self):
+        leave = self.request_leave(date(2025, 3, 7), date(2025, 3, 10))  # Fri-Mon: 2 working days
+        self.assertEqual(decide_leaves([leave.pk], 'APPROVED', self.admin), (1, []))
+        self.assertEqual(self.remaining(), 3)
+        self.assertEqual(
+            list(LeaveLedgerEntry.objects.filter(leave=leave).values_list('kind', 'days', 'created_by')),
+            [('DEBIT', -2, self.admin.pk)],
+        )
+
+    def test_rejecting_an_approved_leave_reverses_the_debit(self):
+        leave = self.request_leave(date(2025, 3, 10), date(2025, 3, 12))
+        decide_leaves([leave.pk], 'APPROVED', self.admin)
+        decide_leaves([leave.pk], 'REJECTED', self.admin)
+        self.assertEqual(self.remaining(), 5)
+        self.assertEqual(
+            list(LeaveLedgerEntry.objects.filter(leave=leave).order_by('pk').values_list('kind', 'days')),
+            [('DEBIT', -3), ('REVERSAL', 3)],
+        )
+        # Nothing left to give back the second time round.
+        decide_leaves([leave.pk], 'APPROVED', self.admin)
+        decide_leaves([leave.pk], 'REJECTED', self.admin)
+        self.assertEqual(self.remaining(), 5)
+
+    def test_approval_the_balance_cannot_cover_stays_pending(self):
+        first = self.request_leave(date(2025, 3, 10), date(2025, 3, 12))
+        second = self.request_leave(date(2025, 3, 17), date(2025, 3, 19))
+        self.assertEqual(decide_leaves([first.pk, second.pk], 'APPROVED', self.admin), (1, [second.pk]))
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'PENDING')
+        self.assertEqual(self.remaining(), 2)
+        self.assertFalse(LeaveLedgerEntry.objects.filter(leave=second).exists())
+
+    def test_ledger_totals_agree_with_the_cached_balances(self):
+        other = User.objects.create_user('other')
+        grant_leave(other, self.casual, 4)
+        approved = self.request_leave(date(2025, 3, 10), date(2025, 3, 11))
+        reversed_leave = self.request_leave(date(2025, 3, 17), date(2025, 3, 17))
+        decide_leaves([approved.pk, reversed_leave.pk], 'APPROVED', self.admin)
+        decide_leaves([reversed_leave.pk], 'REJECTED', self.admin)
+
+        totals = {(row['user_id'], row['leave_type_id']): row for row in ledger_totals()}
+        self.assertEqual(
+            {key: row['remaining'] for key, row in totals.items()},
+            {(balance.user_id, balance.leave_type_id): balance.remaining for balance in LeaveBalance.objects.all()},
+        )
+        mine = totals[self.user.pk, self.casual.pk]
+        self.assertEqual((mine['granted'], mine['used'], mine['remaining']), (5, 2, 3))
+        self.assertEqual(rebuild_balances(), 0)
+
+
+class LeaveDecisionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.employees = [User.objects.create_user(f'emp{i}') for i in range(3)]
+
+    def request_leaves(self, count, status='PENDING'):
+        return [
+            LeaveRequest.objects.create(
+                employee=self.employees[i % len(self.employees)], start_date=date(2025, 3, 10),
+                end_date=date(2025, 3, 11), reason='Trip', status=status,
+            )
+            for i in range(count)
+        ]
+
+    def test_decides_every_selected_leave_with_logs_and_notifications(self):
+        pending = self.request_leaves(4)
+        already = self.request_leaves(1, status='REJECTED')[0]
+        decision = decide_leaves(LeaveRequest.objects.all(), 'REJECTED', self.admin)
+
+        self.assertEqual(decision, (4, []))
+        self.assertEqual(LeaveRequest.objects.filter(status='REJECTED').count(), 5)
+        self.assertEqual(
+            sorted(LeaveLog.objects.values_list('leave_id', 'previous_status', 'new_status', 'changed_by')),
+            [(leave.pk, 'PENDING', 'REJECTED', self.admin.pk) for leave in pending],
+        )
+        self.assertEqual(
+            sorted(NotificationEvent.objects.values_list('leave_id', 'recipient_id')),
+            [(leave.pk, leave.employee_id) for leave in pending],
+        )
+        self.assertFalse(LeaveLog.objects.filter(leave=already).exists())
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        def queries_for(count):
+            leaves = self.request_leaves(count)
+            with CaptureQueriesContext(connection) as ctx:
+                decide_leaves([leave.pk for leave in leaves], 'APPROVED', self.admin)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(2), queries_for(40))
+
+    def test_rejects_unknown_decisions(self):
+        leave = self.request_leaves(1)[0]
+        with self.assertRaises(ValueError):
+            decide_leaves([leave.pk], 'PENDING', self.admin)
+        leave.refresh_from_db()
+        self.assertEqual(leave.status, 'PENDING')
+
+
+@override_settings(LEAVE_LIST_PAGE_SIZE=3)
+class AdminLeaveListPaginationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        employees = [User.objects.create_user(f'emp{i}') for i in range(3)]
+        self.leaves = [
+            LeaveRequest.objects.create(
+                employee=employees[i % 3], start_date=date(2025, 3, 10), end_date=date(2025, 3, 11), reason='Trip',
+            )
+            for i in range(8)
+        ]
+        # Ties on created_at have to be broken by the id, not skipped or repeated.
+        LeaveRequest.objects.filter(pk__in=[leave.pk for leave in self.leaves[2:6]]).update(
+            created_at=self.leaves[2].created_at
+        )
+
+    def pages(self, **params):
+        cursor, pages = None, []
+        while True:
+            response = self.client.get(
+                reverse('admin_leave_list'), {**params, 'format': 'json', **({'cursor': cursor} if cursor else {})}
+            )
+            data = response.json()
+            pages.append([row['id'] for row in data['results']])
+            cursor = data['next_cursor']
+            if not cursor:
+                return pages
+
+    def test_pages_walk_every_leave_newest_first_exactly_once(self):
+        pages = self.pages()
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        expected = LeaveRequest.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+        self.assertEqual([pk for page in pages for pk in page], list(expected))
+
+    def test_filters_carry_over_to_later_pages(self):
+        LeaveRequest.objects.filter(pk__in=[leave.pk for leave in self.leaves[:5]]).update(status='APPROVED')
+        pages = self.pages(status='APPROVED')
+        self.assertEqual(sorted(pk for page in pages for pk in page), [leave.pk for leave in self.leaves[:5]])
+
+    def test_every_page_costs_the_same_queries(self):
+        first = self.client.get(reverse('admin_leave_list'), {'format': 'json'}).json()
+        with CaptureQueriesContext(connection) as first_page:
+            self.client.get(reverse('admin_leave_list'), {'format': 'json'})
+        with CaptureQueriesContext(connection) as next_page:
+            self.client.get(reverse('admin_leave_list'), {'format': 'json', 'cursor': first['next_cursor']})
+        self.assertEqual(len(first_page.captured_queries), len(next_page.captured_queries))
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        malformed = (
+            'not-base64!', encode_cursor(['2025-03-10']), encode_cursor(['abc', 1]), encode_cursor([1, {'a': 1}]),
+            encode_cursor([None, None]),
+        )
+        for cursor in malformed:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('admin_leave_list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(LEAVE_LOG_PAGE_SIZE=3)
+class LeaveLogPaginationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True, is_superuser=True))
+        employees = [User.objects.create_user(f'emp{i}') for i in range(4)]
+        leaves = [
+            LeaveRequest.objects.create(
+                employee=employee, start_date=date(2025, 3, 10), end_date=date(2025, 3, 11), reason='Trip',
+            )
+            for employee in employees
+        ]
+        # Two logs a day from 1 to 4 March: every page boundary falls on a tie.
+        self.logs = []
+        for i in range(8):
+            log = LeaveLog.objects.create(leave=leaves[i % 4], previous_status='PENDING', new_status='APPROVED')
+            LeaveLog.objects.filter(pk=log.pk).update(
+                changed_at=datetime(2025, 3, 1 + i // 2, 10, tzinfo=dt_timezone.utc)
+            )
+            self.logs.append(log)
+
+    def pages(self, **params):
+        cursor, pages = None, []
+        while True:
+            response = self.client.get(
+                reverse('leave_logs'), {**params, 'format': 'json', **({'cursor': cursor} if cursor else {})}
+            )
+            data = response.json()
+            pages.append([row['id'] for row in data['results']])
+            cursor = data['next_cursor']
+            if not cursor:
+                return pages
+
+    def test_pages_walk_every_log_newest_first_exactly_once(self):
+        pages = self.pages()
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual([pk for page in pages for pk in page], [log.pk for log in reversed(self.logs)])
+
+    def test_date_range_is_applied_to_every_page(self):
+        pages = self.pages(since='2025-03-02', until='2025-03-03')
+        self.assertEqual([pk for page in pages for pk in page], [log.pk for log in reversed(self.logs[2:6])])
+
+    def test_page_queries_do_not_grow_with_the_page_size(self):
+        def queries_for_page():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse('leave_logs'), {'format': 'json'})
+            return len(ctx.captured_queries)
+
+        small = queries_for_page()
+        with override_settings(LEAVE_LOG_PAGE_SIZE=8):
+            self.assertEqual(queries_for_page(), small)
+
+    def test_htmx_requests_get_the_rows_and_a_link_to_the_next_page(self):
+        response = self.client.get(reverse('leave_logs'), {'new_status': 'APPROVED'}, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'core/partials/log_rows.html')
+        self.assertTemplateNotUsed(response, 'core/logs.html')
+        self.assertEqual(len(response.context['logs']), 3)
+        self.assertIn('new_status=APPROVED', response.context['next_url'])
+        self.assertIn('cursor=', response.context['next_url'])
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        for cursor in ('not-base64!', encode_cursor(['abc', 1]), encode_cursor(['2025-03-01T10:00:00+00:00', [1]])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('leave_logs'), {'cursor': cursor}).status_code, 400)
+
+    def test_archived_logs_move_to_monthly_files(self):
+        LeaveLog.objects.filter(pk__in=[log.pk for log in self.logs[:2]]).update(
+            changed_at=datetime(2025, 1, 15, 10, tzinfo=dt_timezone.utc)
+        )
+        with tempfile.TemporaryDirectory() as archive_dir, override_settings(LEAVE_LOG_ARCHIVE_DIR=archive_dir):
+            self.assertEqual(archive_leave_logs(date(2025, 2, 1)), 2)
+            self.assertEqual(sorted(row['id'] for row in read_archive('2025-01')), [log.pk for log in self.logs[:2]])
+        self.assertEqual(LeaveLog.objects.count(), 6)
+
+    def test_rerun_after_a_crash_does_not_archive_logs_twice(self):
+        LeaveLog.objects.filter(pk__in=[log.pk for log in self.logs[:3]]).update(
+            changed_at=datetime(2025, 1, 15, 10, tzinfo=dt_timezone.utc)
+        )
+        with tempfile.TemporaryDirectory() as archive_dir, override_settings(LEAVE_LOG_ARCHIVE_DIR=archive_dir):
+            # Dies after the first chunk is written but before it is deleted.
+            with mock.patch('django.db.models.query.QuerySet.delete', side_effect=DatabaseError('disk I/O error')):
+                with self.assertRaises(DatabaseError):
+                    archive_leave_logs(date(2025, 2, 1), chunk_size=2)
+            self.assertEqual(archive_leave_logs(date(2025, 2, 1), chunk_size=2), 3)
+            self.assertEqual(sorted(row['id'] for row in read_archive('2025-01')), [log.pk for log in self.logs[:3]])
+        self.assertEqual(LeaveLog.objects.count(), 5)
+
+
+class LeaveNotificationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.employee = User.objects.create_user('emp', email='emp@example.com')
+
+    def request_leaves(self, count, status='PENDING'):
+        return [
+            LeaveRequest.objects.create(
+                employee=self.employee, start_date=date(2025, 3, 10 + i), end_date=date(2025, 3, 10 + i),
+                reason='Trip', status=status,
+            )
+            for i in range(count)
+        ]
+
+    def test_a_bulk_decision_reaches_each_employee_as_one_digest(self):
+        other = User.objects.create_user('other', email='other@example.com')
+        leaves = self.request_leaves(3) + [LeaveRequest.objects.create(
+            employee=other, start_date=date(2025, 3, 10), end_date=date(2025, 3, 10), reason='Trip',
+        )]
+        decide_leaves([leave.pk for leave in leaves], 'APPROVED', self.admin)
+
+        delivery_ids = build_digests()
+        deliveries = {delivery.recipient_id: delivery for delivery in EmailDelivery.objects.filter(pk__in=delivery_ids)}
+        self.assertEqual(set(deliveries), {self.employee.pk, other.pk})
+        self.assertEqual(deliveries[self.employee.pk].subject, 'Updates on 3 of your leave requests')
+        self.assertEqual(deliveries[other.pk].subject, 'Your leave request was approved')
+        self.assertFalse(NotificationEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(build_digests(), [])
+
+    def test_repeated_decisions_on_one_leave_collapse_into_the_latest(self):
+        leave = self.request_leaves(1)[0]
+        decide_leaves([leave.pk], 'APPROVED', self.admin)
+        decide_leaves([leave.pk], 'REJECTED', self.admin)
+
+        [delivery_id] = build_digests()
+        delivery = EmailDelivery.objects.get(pk=delivery_id)
+        self.assertEqual(delivery.subject, 'Your leave request was rejected')
+        self.assertEqual(
+            set(NotificationEvent.objects.filter(leave=leave).values_list('delivery_id', flat=True)), {delivery_id}
+        )
+
+    def test_a_leave_that_ends_where_it_started_sends_nothing(self):
+        leave = self.request_leaves(1, status='APPROVED')[0]
+        decide_leaves([leave.pk], 'REJECTED', self.admin)
+        decide_leaves([leave.pk], 'APPROVED', self.admin)
+
+        self.assertEqual(build_digests(), [])
+        self.assertFalse(EmailDelivery.objects.exists())
+        self.assertFalse(NotificationEvent.objects.filter(processed_at__isnull=True).exists())
+
+
+class ConcurrentLeaveDecisionTests(TransactionTestCase):
+    # Two admins approving against the same balance at once, on separate
+    # connections: one must wait for the other rather than fail, and the
+    # balance must not be spent twice.
+
+    def setUp(self):
+        invalidate_holiday_calendar()
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.user = User.objects.create_user('emp')
+        self.casual = LeaveType.objects.create(name='Casual')
+        grant_leave(self.user, self.casual, 5)
+        self.leaves = [
+            LeaveRequest.objects.create(
+                employee=self.user, leave_type=self.casual, start_date=start, end_date=start + timedelta(days=2),
+                reason='Trip',
+            )
+            for start in (date(2025, 3, 10), date(2025, 3, 17))  # Mondays: 3 working days each
+        ]
+
+    def test_parallel_approvals_queue_up_on_the_balance(self):
+        # Both decisions reach the balance check together unless one is kept
+        # out of the transaction until the other commits.
+        barrier = threading.Barrier(2)
+        count_days = services.working_days
+
+        def working_days_in_step(*args, **kwargs):
+            try:
+                barrier.wait(timeout=0.5)
+            except threading.BrokenBarrierError:
+                pass
+            return count_days(*args, **kwargs)
+
+        outcomes, errors = [], []
+
+        def approve(leave):
+            try:
+                outcomes.append(decide_leaves([leave.pk], 'APPROVED', self.admin))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        with mock.patch('core.services.working_days', working_days_in_step):
+            threads = [threading.Thread(target=approve, args=(leave,)) for leave in self.leaves]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(decision.decided for decision in outcomes), [0, 1])
+        self.assertEqual(LeaveRequest.objects.filter(status='APPROVED').count(), 1)
+        self.assertEqual(LeaveBalance.objects.get(user=self.user, leave_type=self.casual).remaining, 2)
+
+
+class AttendanceRollupTests(TestCase):
+    day = date(2025, 3, 5)
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.alice, self.bob, self.carol = [User.objects.create_user(name) for name in ('alice', 'bob', 'carol')]
+        Attendance.objects.create(user=self.alice, date=self.day, status='PRESENT')
+        build_daily_summary(self.day)
+
+    def summary(self):
+        return DailyAttendanceSummary.objects.get(date=self.day)
+
+    def test_bitmaps_round_trip_ids_across_bytes(self):
+        ids = [1, 7, 8, 9, 63, 64, 1000]
+        self.assertEqual(bitmap_to_ids(ids_to_bitmap(ids)), ids)
+
+    def test_build_splits_active_users_into_present_and_absent(self):
+        summary = self.summary()
+        self.assertEqual((summary.present_count, summary.absent_count, summary.total_users), (1, 3, 4))
+        self.assertEqual(bitmap_to_ids(summary.present_bitmap), [self.alice.pk])
+        self.assertEqual(bitmap_to_ids(summary.absent_bitmap), sorted([self.admin.pk, self.bob.pk, self.carol.pk]))
+
+    def test_record_attendance_moves_users_to_present(self):
+        mark_attendance_bulk([self.bob.pk, self.carol.pk], self.day, 'PRESENT')
+        summary = self.summary()
+        self.assertEqual((summary.present_count, summary.absent_count, summary.total_users), (3, 1, 4))
+        self.assertEqual(bitmap_to_ids(summary.present_bitmap), sorted([self.alice.pk, self.bob.pk, self.carol.pk]))
+        self.assertEqual(bitmap_to_ids(summary.absent_bitmap), [self.admin.pk])
+
+    def test_status_flip_moves_a_user_back_to_absent(self):
+        record = Attendance.objects.get(user=self.alice, date=self.day)
+        record.status = 'ABSENT'
+        record.save()
+        summary = self.summary()
+        self.assertEqual((summary.present_count, summary.absent_count), (0, 4))
+        self.assertNotIn(self.alice.pk, bitmap_to_ids(summary.present_bitmap))
+        self.assertIn(self.alice.pk, bitmap_to_ids(summary.absent_bitmap))
+        self.assertEqual(summary.present_count + summary.absent_count, summary.total_users)
+
+    def test_summary_page_lists_users_read_back_from_the_bitmap(self):
+        mark_attendance_bulk([self.bob.pk], self.day, 'PRESENT')
+        self.client.force_login(self.admin)
+        present = self.client.get(reverse('attendance_summary'), {'date': '2025-03-05'})
+        absent = self.client.get(reverse('attendance_summary'), {'date': '2025-03-05', 'show': 'absent'})
+        self.assertEqual([user.username for user in present.context['users']], ['alice', 'bob'])
+        self.assertEqual([user.username for user in absent.context['users']], ['admin', 'carol'])
+        self.assertContains(present, 'bob')
+
+
+class AttendanceAnalyticsTests(TestCase):
+    # Week of Monday 2025-03-10 with a holiday on the Wednesday: four business days.
+    start, end = date(2025, 3, 10), date(2025, 3, 14)
+
+    def setUp(self):
+        invalidate_holiday_calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(name='Holi', date=date(2025, 3, 12))
+        alice, bob, self.carol = [User.objects.create_user(name) for name in ('alice', 'bob', 'carol')]
+        team = Group.objects.create(name='Support')
+        team.user_set.add(alice, bob)
+
+        def mark(user, day, hour, minute):
+            Attendance.objects.create(
+                user=user, date=date(2025, 3, day), status='PRESENT',
+                marked_at=datetime(2025, 3, day, hour, minute, tzinfo=dt_timezone.utc),
+            )
+
+        for day, hour, minute in ((10, 9, 0), (11, 10, 0), (13, 9, 15), (14, 9, 20)):
+            mark(alice, day, hour, minute)
+        mark(bob, 10, 9, 0)
+        LeaveRequest.objects.create(
+            employee=bob, start_date=date(2025, 3, 13), end_date=date(2025, 3, 14), reason='Trip', status='APPROVED',
+        )
+
+    def test_report_figures(self):
+        report = attendance_report(self.start, self.end)
+        self.assertEqual(report['business_days'], 4)
+
+        employees = report['employees'].set_index('username')
+        columns = ['expected_days', 'present_days', 'leave_days', 'attendance_pct', 'longest_absence_streak',
+                   'current_absence_streak', 'late_marks', 'late_pct', 'avg_mark_time']
+        self.assertEqual(
+            {name: list(row) for name, row in employees[columns].iterrows()},
+            {
+                'alice': [4, 4, 0, 100.0, 0, 0, 1, 25.0, '09:23'],
+                'bob': [2, 1, 2, 50.0, 1, 0, 0, 0.0, '09:00'],
+                'carol': [4, 0, 0, 0.0, 4, 4, 0, 0.0, ''],
+            },
+        )
+        self.assertEqual(
+            report['late_by_weekday'].to_dict(), {'Mon': 0.0, 'Tue': 100.0, 'Wed': 0.0, 'Thu': 0.0, 'Fri': 0.0}
+        )
+        heatmap = report['team_heatmap']
+        self.assertEqual(list(heatmap.columns), [date(2025, 3, day) for day in (10, 11, 13, 14)])
+        self.assertEqual(heatmap.loc['Support'].tolist(), [100.0, 50.0, 100.0, 100.0])
+        self.assertEqual(heatmap.loc['Unassigned'].tolist(), [0.0, 0.0, 0.0, 0.0])
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profiling.metrics.reset()
+        self.employee = User.objects.create_user('emp')
+        self.client.force_login(self.employee)
+
+    def series(self, histogram, view):
+        counts, count, total = histogram._series[view]
+        return count, total
+
+    def test_requests_are_timed_and_counted_per_view(self):
+        # request_started resets connection.queries, so count through a wrapper instead.
+        executed = []
+        with connection.execute_wrapper(lambda execute, sql, *args: executed.append(sql) or execute(sql, *args)):
+            self.client.get(reverse('leave_history'))
+        self.client.get(reverse('attendance_summary'), {'date': '2025-03-05'})  # async view
+
+        metrics = profiling.metrics
+        self.assertEqual(self.series(metrics.queries, 'leave_history'), (1, len(executed)))
+        self.assertEqual(self.series(metrics.latency, 'leave_history')[0], 1)
+        self.assertGreater(self.series(metrics.template_time, 'leave_history')[1], 0)
+        self.assertGreater(self.series(metrics.db_time, 'leave_history')[1], 0)
+        self.assertEqual(self.series(metrics.latency, 'attendance_summary')[0], 1)
+        self.assertGreater(self.series(metrics.queries, 'attendance_summary')[1], 0)
+
+    def test_queries_outside_a_request_are_not_recorded(self):
+        User.objects.count()
+        self.assertEqual(profiling.metrics.queries._series, {})
+
+    @override_settings(PROFILING_DUPLICATE_QUERY_THRESHOLD=1)
+    def test_repeated_statements_are_logged_and_counted(self):
+        with self.assertLogs('core.profiling', 'WARNING'):
+            self.client.get(reverse('leave_history'))
+        self.assertEqual(profiling.metrics.duplicates['leave_history'], 1)
+
+    def test_metrics_endpoint_serves_the_histograms(self):
+        self.client.get(reverse('leave_history'))
+        self.assertEqual(self.client.get(reverse('prometheus_metrics')).status_code, 403)
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        body = self.client.get(reverse('prometheus_metrics')).content.decode()
+        self.assertIn('# TYPE view_request_seconds histogram', body)
+        self.assertIn('view_request_seconds_count{view="leave_history"} 1', body)
+        self.assertIn('view_db_queries_bucket{view="leave_history",le="+Inf"} 1', body)
+        self.assertIn('# TYPE dashboard_cache_hits_total counter', body)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_endpoint_accepts_the_scrape_token(self):
+        self.client.logout()
+        metrics_url = reverse('prometheus_metrics')
+        self.assertEqual(self.client.get(metrics_url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(metrics_url, HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 200)
+
+
+@mock.patch('core.db.replica_alias', return_value='replica')
+class ReplicaRoutingTests(TestCase):
+    # replica_alias() is patched: tests have no separate replica, and the real
+    # one falls back to the primary (see ReplicaAliasTests).
+
+    def test_reads_go_to_the_replica_inside_read_from_replica(self, _alias):
+        self.assertEqual(User.objects.all().db, 'default')
+        with read_from_replica():
+            self.assertEqual(router.db_for_read(User), 'replica')
+            self.assertEqual(User.objects.all().db, 'replica')
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_read_from_primary_overrides_inside_the_block(self, _alias):
+        with read_from_replica():
+            with read_from_primary():
+                self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_read(User), 'replica')
+
+    def test_writes_always_go_to_the_primary(self, _alias):
+        with read_from_replica():
+            self.assertEqual(router.db_for_write(User), 'default')
+            self.assertEqual(User.objects.select_for_update().db, 'default')
+
+    def test_decorates_sync_and_async_functions(self, _alias):
+        @read_from_replica()
+        def sync_view():
+            return router.db_for_read(User)
+
+        @read_from_replica()
+        async def async_view():
+            return router.db_for_read(User)
+
+        self.assertEqual(sync_view(), 'replica')
+        self.assertEqual(async_to_sync(async_view)(), 'replica')
+        self.assertEqual(router.db_for_read(User), 'default')
+
+
+
+class ReplicaAliasTests(TestCase):
+    def test_falls_back_to_the_primary_without_a_replica(self):
+        with override_settings(DATABASE_REPLICA_ALIAS='missing'):
+            self.assertEqual(replica_alias(), 'default')
+        # A replica mirroring the primary's database reads through the primary.
+        with override_settings(DATABASE_REPLICA_ALIAS='default'):
+            self.assertEqual(replica_alias(), 'default')
+        with read_from_replica():
+            self.assertEqual(User.objects.all().db, 'default')
+
+
+class LiveDashboardTests(TestCase):
+    def setUp(self):
+        self.day = date(2025, 3, 5)
+        self.user = User.objects.create_user('alice')
+        build_daily_summary(self.day)
+
+    def check_in(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_attendance_bulk([self.user.pk], self.day)
+
+    def test_published_checkin_reaches_a_subscriber(self):
+        async def listen():
+            subscription = live.broker.subscribe()
+            try:
+                await sync_to_async(self.check_in)()
+                return await asyncio.wait_for(subscription.get(), 5)
+            finally:
+                live.broker.unsubscribe(subscription)
+
+        event = async_to_sync(listen)()
+        self.assertEqual(event.date, self.day)
+        self.assertIn(b'event: counts\n', event.message)
+        self.assertIn(b'event: checkin\ndata: <li>alice</li>\n', event.message)
+        self.assertFalse(live.broker.has_subscribers())
+
+    def test_stream_unsubscribes_when_the_client_disconnects(self):
+        async def connect_and_leave():
+            stream = views._live_events(self.day)
+            first = await anext(stream)
+            subscribed = live.broker.has_subscribers()
+            await stream.aclose()  # what the server does when the client goes away
+            return first, subscribed
+
+        first, subscribed = async_to_sync(connect_and_leave)()
+        self.assertTrue(first.startswith(b'event: counts\n'))
+        self.assertTrue(subscribed)
+        self.assertFalse(live.broker.has_subscribers())
+
+    def test_subscriber_on_a_closed_loop_is_dropped(self):
+        async def subscribe():
+            return live.broker.subscribe()
+
+        subscription = asyncio.run(subscribe())
+        self.assertTrue(live.broker.has_subscribers())
+        live.broker.publish(live.LiveEvent(self.day, b''))
+        self.assertFalse(live.broker.has_subscribers())
+        self.assertTrue(subscription.queue.empty())
+
+    def test_wsgi_request_gets_the_counts_and_a_retry(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('attendance_live'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'retry: '))
+        self.assertIn(b'event: counts\n', body)
+
+
+class WhoIsOutTests(TestCase):
+    # Leaves are inclusive at both ends, as is the [start, end] window asked about.
+
+    def setUp(self):
+        self.start, self.end = date(2025, 3, 10), date(2025, 3, 14)
+        self.leaves = {}
+        for username, start, end, status in [
+            ('ends_on_start', date(2025, 3, 6), date(2025, 3, 10), 'APPROVED'),
+            ('starts_on_end', date(2025, 3, 14), date(2025, 3, 18), 'APPROVED'),
+            ('ends_before', date(2025, 3, 3), date(2025, 3, 9), 'APPROVED'),
+            ('starts_after', date(2025, 3, 15), date(2025, 3, 17), 'APPROVED'),
+            ('pending', date(2025, 3, 12), date(2025, 3, 12), 'PENDING'),
+            ('rejected', date(2025, 3, 11), date(2025, 3, 11), 'REJECTED'),
+        ]:
+            self.leaves[username] = LeaveRequest.objects.create(
+                employee=User.objects.create_user(username), start_date=start, end_date=end, reason='Trip',
+                status=status,
+            )
+
+    def out(self, *args, **kwargs):
+        return [leave.employee.username for leave in leaves_on(*args, **kwargs)]
+
+    def test_leaves_touching_either_edge_are_included(self):
+        self.assertEqual(self.out(self.start, self.end), ['ends_on_start', 'starts_on_end'])
+
+    def test_single_day_defaults_end_to_start(self):
+        self.assertEqual(self.out(self.start), ['ends_on_start'])
+        self.assertEqual(self.out(self.end), ['starts_on_end'])
+
+    def test_include_pending(self):
+        self.assertEqual(
+            self.out(self.start, self.end, include_pending=True), ['ends_on_start', 'pending', 'starts_on_end']
+        )
+
+    def test_view(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        url = reverse('who_is_out')
+        response = self.client.get(url, {'start': '2025-03-10', 'end': '2025-03-14', 'format': 'json'})
+        self.assertEqual(
+            [row['employee'] for row in response.json()['results']], ['ends_on_start', 'starts_on_end']
+        )
+        response = self.client.get(url, {'start': '2025-03-10', 'end': '2025-03-14', 'pending': '1', 'format': 'json'})
+        self.assertEqual(
+            [(row['employee'], row['status']) for row in response.json()['results']],
+            [('ends_on_start', 'APPROVED'), ('pending', 'PENDING'), ('starts_on_end', 'APPROVED')],
+        )
+        self.assertContains(self.client.get(url, {'start': '2025-03-14'}), 'starts_on_end')
+        self.assertEqual(self.client.get(url, {'start': '2025-03-14', 'end': '2025-03-10'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'soon'}).status_code, 400)
+
+
+class FlakySMTPBackend(locmem.EmailBackend):
+    # Refuses the addresses in `refused` and drops the connection after
+    # `disconnect_after` messages, the way an SMTP server can.
+    def __init__(self, refused=(), disconnect_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.refused, self.disconnect_after = set(refused), disconnect_after
+        self.opened = 0
+
+    def open(self):
+        self.opened += 1
+
+    def send_messages(self, messages):
+        if self.disconnect_after is not None and len(mail.outbox) >= self.disconnect_after:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        for message in messages:
+            if message.to[0] in self.refused:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+class MailerTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            User.objects.create_user(f'u{i}', email=f'u{i}@example.com')
+        User.objects.create_user('no_email')
+        self.ids = queue_deliveries('test', User.objects.all(), 'Subject', 'Body')
+
+    def statuses(self):
+        return list(EmailDelivery.objects.order_by('pk').values_list('email', 'status', 'attempts'))
+
+    def test_recipients_without_an_address_are_skipped(self):
+        self.assertEqual(len(self.ids), 3)
+        self.assertEqual(batched(range(5), 2), [[0, 1], [2, 3], [4]])
+
+    def test_batch_is_sent_over_one_connection(self):
+        connection = FlakySMTPBackend()
+        self.assertEqual(send_delivery_batch(self.ids, connection=connection), 3)
+        self.assertEqual(connection.opened, 1)
+        self.assertEqual(
+            [message.to for message in mail.outbox], [['u0@example.com'], ['u1@example.com'], ['u2@example.com']]
+        )
+        self.assertEqual({status for _, status, _ in self.statuses()}, {'SENT'})
+        # Already-sent rows are not sent again.
+        self.assertEqual(send_delivery_batch(self.ids), 0)
+
+    def test_refused_recipient_is_marked_failed_and_the_batch_continues(self):
+        with self.assertLogs('core.mailer', 'WARNING'):
+            sent = send_delivery_batch(self.ids, connection=FlakySMTPBackend(refused={'u1@example.com'}))
+        self.assertEqual(sent, 2)
+        self.assertEqual(self.statuses(), [
+            ('u0@example.com', 'SENT', 1), ('u1@example.com', 'FAILED', 1), ('u2@example.com', 'SENT', 1),
+        ])
+        self.assertIn('No such user', EmailDelivery.objects.get(email='u1@example.com').error)
+
+    def test_connection_error_leaves_unsent_rows_for_the_retry(self):
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            send_delivery_batch(self.ids, connection=FlakySMTPBackend(disconnect_after=1))
+        self.assertEqual(self.statuses(), [
+            ('u0@example.com', 'SENT', 1), ('u1@example.com', 'PENDING', 1), ('u2@example.com', 'PENDING', 1),
+        ])
+        self.assertEqual(send_delivery_batch(self.ids, connection=FlakySMTPBackend()), 2)
+        self.assertEqual(self.statuses(), [
+            ('u0@example.com', 'SENT', 1), ('u1@example.com', 'SENT', 2), ('u2@example.com', 'SENT', 2),
+        ])
+
+    def run_delivery_task(self, retries):
+        deliver_email_batch.push_request(retries=retries)
+        try:
+            return deliver_email_batch.run(self.ids)
+        finally:
+            deliver_email_batch.pop_request()
+
+    @override_settings(EMAIL_RETRY_BACKOFF=30)
+    @mock.patch('core.tasks.send_delivery_batch', side_effect=smtplib.SMTPServerDisconnected('gone'))
+    def test_task_retries_connection_errors_with_backoff(self, _send):
+        with mock.patch.object(deliver_email_batch, 'retry', side_effect=Retry) as retry:
+            for retries in range(3):
+                with self.assertRaises(Retry):
+                    self.run_delivery_task(retries)
+        self.assertEqual([call.kwargs['countdown'] for call in retry.call_args_list], [30, 60, 120])
+        self.assertEqual({status for _, status, _ in self.statuses()}, {'PENDING'})
+
+    @mock.patch('core.tasks.send_delivery_batch', side_effect=smtplib.SMTPServerDisconnected('gone'))
+    def test_task_marks_the_batch_failed_once_retries_run_out(self, _send):
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.run_delivery_task(deliver_email_batch.max_retries)
+        self.assertEqual(set(EmailDelivery.objects.values_list('status', 'error')), {('FAILED', 'gone')})
+
+
+class DataExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        casual = LeaveType.objects.create(name='Casual')
+        employee = User.objects.create_user('emp')
+        for day, reason in [(3, 'Trip'), (4, '=HYPERLINK("http://evil.test","x")'), (5, '-2+3'), (6, '@SUM(A1)')]:
+            LeaveRequest.objects.create(
+                employee=employee, leave_type=casual, start_date=date(2025, 3, day), end_date=date(2025, 3, day),
+                reason=reason,
+            )
+        LeaveRequest.objects.create(
+            employee=employee, leave_type=casual, start_date=date(2025, 4, 1), end_date=date(2025, 4, 1), reason='Later'
+        )
+
+    def export(self, fmt, month='2025-03', dataset='leave'):
+        return self.client.get(reverse('export_data', args=[dataset, fmt]), {'month': month})
+
+    @override_settings(EXPORT_ITERATOR_CHUNK_SIZE=2)
+    def test_csv_streams_every_row_with_formulas_escaped(self):
+        response = self.export('csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Leave_2025-03.csv"')
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[0], ['Employee', 'Leave Type', 'Start', 'End', 'Status', 'Reason', 'Applied At'])
+        self.assertEqual(rows[1][:6], ['emp', 'Casual', '2025-03-03', '2025-03-03', 'PENDING', 'Trip'])
+        self.assertEqual(
+            [row[5] for row in rows[1:]], ['Trip', '\'=HYPERLINK("http://evil.test","x")', "'-2+3", "'@SUM(A1)"]
+        )
+
+    def test_xlsx_holds_the_same_rows_as_text(self):
+        response = self.export('xlsx')
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][5], 'Reason')
+        self.assertEqual(rows[1][:4], ('emp', 'Casual', datetime(2025, 3, 3), datetime(2025, 3, 3)))
+        self.assertEqual(
+            [row[5] for row in rows[1:]], ['Trip', '\'=HYPERLINK("http://evil.test","x")', "'-2+3", "'@SUM(A1)"]
+        )
+        self.assertEqual({cell.data_type for cell in sheet['F']}, {'s'})
+
+    def test_empty_month_keeps_the_header(self):
+        self.assertEqual(b''.join(self.export('csv', month='2025-01').streaming_content).decode().count('\n'), 1)
+        sheet = load_workbook(io.BytesIO(b''.join(self.export('xlsx', month='2025-01').streaming_content))).active
+        self.assertEqual(sheet.max_row, 1)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.export('csv', month='March').status_code, 400)
+        self.assertEqual(self.export('pdf').status_code, 404)
+        self.assertEqual(self.export('csv', dataset='salaries').status_code, 404)
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.client.force_login(self.owner)
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        self.enterContext(override_settings(EXPORT_ROOT=export_root.name))
+
+    def start_export(self):
+        with mock.patch('core.views.generate_pdf_export') as task:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(reverse('export_leave_pdf'))
+        job = ExportJob.objects.get()
+        task.delay.assert_called_once_with(job.pk)
+        self.assertRedirects(response, reverse('export_status', args=[job.pk]))
+        return job
+
+    def build(self, job):
+        with open(f'{settings.EXPORT_ROOT}/{job.pk}_report.pdf', 'wb') as fh:
+            fh.write(b'%PDF-1.7')
+        return f'{job.pk}_report.pdf', 3
+
+    def status(self, job, **headers):
+        return self.client.get(reverse('export_status', args=[job.pk]), **headers)
+
+    def test_job_runs_from_pending_to_done(self):
+        job = self.start_export()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertContains(self.status(job), 'hx-trigger="every 2s"')
+        self.assertEqual(self.client.get(reverse('export_download', args=[job.pk])).status_code, 404)
+
+        with mock.patch('core.tasks.build_pdf_export', side_effect=self.build):
+            generate_pdf_export(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows), ('DONE', 3))
+        self.assertIsNotNone(job.finished_at)
+
+        response = self.status(job, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'core/partials/export_status.html')
+        self.assertTemplateNotUsed(response, 'core/export_status.html')
+        self.assertNotContains(response, 'hx-trigger')
+        self.assertContains(response, reverse('export_download', args=[job.pk]))
+
+        response = self.client.get(reverse('export_download', args=[job.pk]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('filename="Leave_Requests.pdf"', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.7')
+
+    def test_failed_job_records_the_error(self):
+        job = self.start_export()
+        with mock.patch('core.tasks.build_pdf_export', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                generate_pdf_export(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('FAILED', 'disk full'))
+        self.assertContains(self.status(job, HTTP_HX_REQUEST='true'), 'Export failed: disk full')
+        self.assertEqual(self.client.get(reverse('export_download', args=[job.pk])).status_code, 404)
+
+    def test_other_users_cannot_see_or_download_a_job(self):
+        job = self.start_export()
+        with mock.patch('core.tasks.build_pdf_export', side_effect=self.build):
+            generate_pdf_export(job.pk)
+
+        self.client.force_login(User.objects.create_user('someone_else'))
+        self.assertEqual(self.status(job).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_download', args=[job.pk])).status_code, 404)
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(self.client.get(reverse('export_download', args=[job.pk])).status_code, 200)
@@ -15,8 +15,10 @@ urlpatterns = [
 
     # Leave
     path('apply/', views.apply_leave, name='apply_leave'),
+    path('apply/preview/', views.leave_preview, name='leave_preview'),
     path('history/', views.leave_history, name='leave_history'),
     path('leaves/', views.admin_leave_list, name='admin_leave_list'),
+    path('leaves/out/', views.who_is_out, name='who_is_out'),
     path('update/<int:pk>/<str:status>/', views.update_leave_status, name='update_leave_status'),
     path('leave-logs/', leave_logs, name='leave_logs'),
 
@@ -24,11 +26,23 @@ urlpatterns = [
     path('attendance/mark/', views.mark_attendance, name='mark_attendance'),
     path('attendance/history/', views.attendance_history, name='attendance_history'),
     path('attendance-summary/', views.attendance_summary, name='attendance_summary'),
+    path('attendance-summary/live/', views.attendance_live, name='attendance_live'),
     path('manual-attendance/', manual_attendance, name='manual_attendance'),
     path('attendance/manual/self/', views.self_manual_attendance, name='self_manual_attendance'),
+    path('attendance/batch/', views.attendance_batch, name='attendance_batch'),
+    path('api/checkins/', views.checkin_ingest, name='checkin_ingest'),
+    path('api/leave-balances/', views.leave_balances_api, name='leave_balances_api'),
+    path('api/analytics/attendance/', views.attendance_analytics, name='attendance_analytics'),
 
     # Exports
     path('export-attendance-pdf/', views.export_attendance_pdf, name='export_attendance_pdf'),
     path('export-leave-pdf/', views.export_leave_pdf, name='export_leave_pdf'),
     path('export/holidays/', export_holiday_pdf, name='export_holiday_pdf'),
+    path('exports/<int:pk>/', views.export_status, name='export_status'),
+    path('exports/<int:pk>/download/', views.export_download, name='export_download'),
+    path('export/<str:dataset>/<str:fmt>/', views.export_data, name='export_data'),
+
+    # Diagnostics
+    path('metrics', views.prometheus_metrics, name='prometheus_metrics'),
+    path('metrics/cache/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
 ]
@@ -1,26 +1,71 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.views import redirect_to_login
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.admin.views.decorators import staff_member_required
-from django.template.loader import render_to_string
-from django.http import HttpResponse
-from weasyprint import HTML
-from datetime import datetime, date
+from django.http import HttpResponse, HttpResponseBadRequest, FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.views.decorators.csrf import csrf_exempt
+from django.db import IntegrityError, transaction
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+import asyncio
+import calendar
+import hmac
+import json
+import logging
+from functools import wraps
+from datetime import datetime, date, timedelta
 from django.contrib.auth.models import User
-
-from .models import LeaveRequest, Attendance, LeaveLog, Holiday, LeaveType
-from .forms import LeaveForm, ManualAttendanceForm
-from .signals import set_current_user
+from django.core.paginator import Paginator
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import LeaveRequest, Attendance, LeaveLog, LeaveType, LeaveBalance, ExportJob, DeviceToken
+from .forms import LeaveForm, ManualAttendanceForm, BulkAttendanceForm, LeaveFilterForm, LogFilterForm
+from .services import LEAVE_DECISIONS, decide_leaves, leaves_on, mark_attendance_bulk
+from .checkins import ingest_checkins, parse_events, summarize
+from .holidays import aget_holiday_calendar
+from .workdays import working_days_between
+from .rollups import aget_daily_summary, bitmap_to_ids
+from .pagination import keyset_response
+from .db import read_from_replica, release_connections, replica_alias
+from .ledger import ledger_totals
+from . import analytics
+from . import dashboard_cache
+from . import live
+from . import profiling
+from .exports import DATASETS, EXPORT_FORMATS, dataset_queryset, export_file_path, report_filename
+from .tasks import generate_pdf_export
+
+logger = logging.getLogger(__name__)
+
+
+def alogin_required(view):
+    # login_required for async views; Django 5.0's only wraps sync ones. The
+    # resolved user replaces the lazy request.user, which would otherwise hit
+    # the database synchronously as soon as a template touched it.
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
 
 
 # -------------------- Employee Views --------------------
 
 @login_required
 def apply_leave(request):
-    form = LeaveForm(request.POST or None)
+    form = LeaveForm(request.POST or None, employee=request.user)
     leave_types = LeaveType.objects.all()
+    balances = LeaveBalance.objects.filter(user=request.user).select_related('leave_type')
+    context = {'form': form, 'leave_types': leave_types, 'balances': balances}
 
     if request.method == "POST":
         if form.is_valid():
@@ -33,111 +78,288 @@ def apply_leave(request):
                     leave.leave_type = LeaveType.objects.get(id=leave_type_id)
                 except LeaveType.DoesNotExist:
                     messages.error(request, "Invalid leave type selected.")
-                    return render(request, 'core/apply_leave.html', {
-                        'form': form, 'leave_types': leave_types
-                    })
+                    return render(request, 'core/apply_leave.html', context)
             else:
                 messages.error(request, "Please select a leave type.")
-                return render(request, 'core/apply_leave.html', {
-                    'form': form, 'leave_types': leave_types
-                })
+                return render(request, 'core/apply_leave.html', context)
+
+            days = working_days_between(leave.start_date, leave.end_date)
+            balance = next((b for b in balances if b.leave_type_id == leave.leave_type.id), None)
+            if balance is not None and days > balance.remaining:
+                messages.error(
+                    request,
+                    f"Insufficient {leave.leave_type.name} balance: {days} working day(s) requested, "
+                    f"{balance.remaining} remaining.",
+                )
+                return render(request, 'core/apply_leave.html', context)
 
             leave.save()
-            messages.success(request, "Leave applied successfully!")
+            messages.success(request, f"Leave applied successfully! ({days} working day(s))")
             return redirect('leave_history')
         else:
             messages.error(request, "There was a problem with your form.")
-            print(form.errors)
+            logger.info("Leave application by %s rejected: %s", request.user.pk, form.errors.as_json())
+
+    return render(request, 'core/apply_leave.html', context)
+
 
-    return render(request, 'core/apply_leave.html', {
-        'form': form, 'leave_types': leave_types
+@login_required
+def leave_preview(request):
+    # HTMX fragment: working days the requested range would charge against the balance.
+    try:
+        start = date.fromisoformat(request.GET.get("start_date", ""))
+        end = date.fromisoformat(request.GET.get("end_date", ""))
+        leave_type_id = int(request.GET["leave_type"]) if request.GET.get("leave_type") else None
+    except ValueError:
+        return HttpResponse("")
+
+    days = working_days_between(start, end)
+    balance = LeaveBalance.objects.filter(
+        user=request.user, leave_type_id=leave_type_id
+    ).select_related('leave_type').first()
+    return render(request, 'core/partials/leave_preview.html', {
+        'days': days,
+        'balance': balance,
+        'remaining_after': balance.remaining - days if balance else None,
     })
 
 
 @login_required
 def leave_history(request):
-    leaves = LeaveRequest.objects.filter(employee=request.user)
-    return render(request, 'core/leave_history.html', {'leaves': leaves})
+    history = dashboard_cache.get_or_set('leave_history', request.user.pk, lambda: render_to_string(
+        'core/partials/leave_history_list.html',
+        {'leaves': LeaveRequest.objects.filter(employee=request.user).order_by('-start_date')},
+    ))
+    return render(request, 'core/leave_history.html', {'history': mark_safe(history)})
 
 
-@login_required
-def mark_attendance(request):
+# The check-in hot paths are async: under ASGI a request waiting on the
+# database or cache no longer holds a worker thread. They keep working under
+# WSGI, where Django runs them in an event loop of their own.
+
+@alogin_required
+async def mark_attendance(request):
     today = timezone.localdate()
 
-    if Holiday.objects.filter(date=today).exists():
+    if (await aget_holiday_calendar()).is_holiday(today):
         messages.warning(request, "Today is a holiday.")
         return redirect('attendance_history')
 
-    already_marked = Attendance.objects.filter(user=request.user, date=today).exists()
-    if already_marked:
+    # Same rules as mark_attendance_bulk(): a backfilled ABSENT / ON_LEAVE
+    # gives way to a check-in, anything else stands.
+    records = Attendance.objects.filter(user=request.user, date=today)
+    status = await records.values_list('status', flat=True).afirst()
+    if status is not None and status not in Attendance.BACKFILL_STATUSES:
+        messages.info(request, "Attendance already marked for today.")
+        return redirect('attendance_history')
+
+    try:
+        if status is None:
+            await Attendance.objects.acreate(user=request.user, date=today, status='PRESENT')
+        else:
+            # save() rather than update() so the rollup and cache signals fire.
+            record = await records.aget()
+            record.status = 'PRESENT'
+            record.marked_at = timezone.now()
+            await record.asave(update_fields=['status', 'marked_at'])
+    except IntegrityError:
+        # A concurrent request (a double click) marked it first.
         messages.info(request, "Attendance already marked for today.")
     else:
-        Attendance.objects.create(user=request.user, date=today, status='PRESENT')
         messages.success(request, "Attendance marked successfully.")
 
     return redirect('attendance_history')
 
 
-@login_required
-def attendance_history(request):
-    records = Attendance.objects.filter(user=request.user).order_by('-date')
-    return render(request, 'core/attendance_history.html', {'records': records})
+@alogin_required
+async def attendance_history(request):
+    async def build():
+        records = [record async for record in Attendance.objects.filter(user=request.user).order_by('-date')]
+        return render_to_string('core/partials/attendance_history_list.html', {'records': records})
+
+    history = await dashboard_cache.aget_or_set('attendance_history', request.user.pk, build)
+    return render(request, 'core/attendance_history.html', {'history': mark_safe(history)})
 
 
 # -------------------- Admin Views --------------------
 
 @user_passes_test(lambda u: u.is_staff)
 def admin_leave_list(request):
-    leaves = LeaveRequest.objects.all()
-    return render(request, 'core/admin_leave_list.html', {'leaves': leaves})
+    form = LeaveFilterForm(request.GET or None)
+    if form.is_bound and not form.is_valid():
+        return HttpResponseBadRequest("Invalid filters")
+
+    leaves = LeaveRequest.objects.select_related('employee', 'leave_type')
+    if form.is_bound:
+        leaves = form.filter(leaves)
+    return keyset_response(
+        request, leaves, ('created_at', 'id'), settings.LEAVE_LIST_PAGE_SIZE,
+        name='leaves', template='core/admin_leave_list.html', partial_template='core/partials/leave_rows.html',
+        serialize=lambda leave: {
+            'id': leave.id,
+            'employee': leave.employee.username,
+            'leave_type': leave.leave_type.name if leave.leave_type else None,
+            'start_date': leave.start_date,
+            'end_date': leave.end_date,
+            'status': leave.status,
+            'created_at': leave.created_at,
+        },
+        context={'form': form},
+    )
 
 
 @user_passes_test(lambda u: u.is_staff)
 def update_leave_status(request, pk, status):
-    leave = get_object_or_404(LeaveRequest, pk=pk)
-    set_current_user(request.user)
-    leave.status = status
-    leave.save()
-    return render(request, 'core/partials/leave_status.html', {'leave': leave})
+    if status not in LEAVE_DECISIONS:
+        return HttpResponseBadRequest("Invalid leave status")
+    _, insufficient = decide_leaves([pk], status, request.user)
+    leave = get_object_or_404(LeaveRequest.objects.select_related('employee'), pk=pk)
+    return render(request, 'core/partials/leave_status.html', {
+        'leave': leave,
+        'error': "Insufficient leave balance." if insufficient else None,
+    })
+
+
+@staff_member_required
+@read_from_replica()
+def who_is_out(request):
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else start
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date")
+    if end < start:
+        return HttpResponseBadRequest("End date cannot be before start date")
+
+    leaves = list(leaves_on(start, end, include_pending=request.GET.get('pending') == '1'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'start': start,
+            'end': end,
+            'results': [
+                {
+                    'employee': leave.employee.username,
+                    'leave_type': leave.leave_type.name if leave.leave_type else None,
+                    'start_date': leave.start_date,
+                    'end_date': leave.end_date,
+                    'status': leave.status,
+                }
+                for leave in leaves
+            ],
+        })
+    return render(request, 'core/who_is_out.html', {'leaves': leaves, 'start': start, 'end': end})
 
 
 @staff_member_required
+@read_from_replica()
 def leave_logs(request):
-    logs = LeaveLog.objects.select_related('leave', 'changed_by').order_by('-changed_at')
-    return render(request, 'core/logs.html', {'logs': logs})
+    form = LogFilterForm(request.GET or None)
+    if form.is_bound and not form.is_valid():
+        return HttpResponseBadRequest("Invalid filters")
+
+    logs = LeaveLog.objects.select_related('leave__employee', 'changed_by')
+    if form.is_bound:
+        logs = form.filter(logs)
+    return keyset_response(
+        request, logs, ('changed_at', 'id'), settings.LEAVE_LOG_PAGE_SIZE,
+        name='logs', template='core/logs.html', partial_template='core/partials/log_rows.html',
+        serialize=lambda log: {
+            'id': log.id,
+            'leave_id': log.leave_id,
+            'employee': log.leave.employee.username,
+            'changed_by': log.changed_by.username if log.changed_by else None,
+            'previous_status': log.previous_status,
+            'new_status': log.new_status,
+            'changed_at': log.changed_at,
+        },
+        context={'form': form},
+    )
 
 @user_passes_test(lambda u: u.is_staff)
 def manual_attendance(request):
-    users = User.objects.all()
+    users = User.objects.only('id', 'username').order_by('username')
     today = timezone.localdate()
-
-    if request.method == "POST":
-        selected_user_ids = request.POST.getlist("user_ids")
-        
-        for user_id in selected_user_ids:
-            user = User.objects.get(id=user_id)
-            # Delete any duplicate existing records for today
-            Attendance.objects.filter(user=user, date=today).delete()
-            # Create one clean record
-            Attendance.objects.create(user=user, date=today, status='PRESENT')
-
-        messages.success(request, "Manual attendance marked successfully.")
+    form = BulkAttendanceForm(request.POST or None, initial={'date': today})
+
+    if request.method == "POST" and form.is_valid():
+        try:
+            result = mark_attendance_bulk(
+                request.POST.getlist("user_ids"),
+                form.cleaned_data['date'],
+                form.cleaned_data['status'],
+            )
+        except ValueError:
+            messages.error(request, "Invalid user selection.")
+            return redirect("manual_attendance")
+        messages.success(
+            request,
+            f"Manual attendance marked for {len(result.created) + len(result.updated)} user(s).",
+        )
         return redirect("attendance_summary")
 
     return render(request, "core/manual_attendance.html", {
         "users": users,
         "today": today,
+        "form": form,
     })
+
+
+@user_passes_test(lambda u: u.is_staff)
+@require_POST
+def attendance_batch(request):
+    # JSON batch marking for staff, from the browser or a script holding a
+    # staff session and its CSRF token. Badge and biometric devices post to
+    # checkin_ingest with a DeviceToken instead.
+    # {"user_ids": [...], "date": "YYYY-MM-DD", "status": "PRESENT", "overwrite": true}
+    try:
+        payload = json.loads(request.body)
+        user_ids = payload['user_ids']
+        # A bare string would be iterated character by character: "12" marks users 1 and 2.
+        if not isinstance(user_ids, list) or not all(type(user_id) is int for user_id in user_ids):
+            raise ValueError("user_ids must be a list of integers")
+        day = date.fromisoformat(payload['date']) if payload.get('date') else timezone.localdate()
+        result = mark_attendance_bulk(
+            user_ids,
+            day,
+            payload.get('status', 'PRESENT'),
+            overwrite=payload.get('overwrite', True),
+        )
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    return JsonResponse({'date': day.isoformat(), **result._asdict()})
+
+
+@csrf_exempt
+@require_POST
+def checkin_ingest(request):
+    # Token-authenticated NDJSON ingestion for badge/biometric devices.
+    auth = request.headers.get('Authorization', '')
+    key = auth[len('Token '):] if auth.startswith('Token ') else ''
+    if not key or not DeviceToken.objects.filter(key=key, is_active=True).exists():
+        return JsonResponse({'error': 'Invalid device token'}, status=401)
+
+    try:
+        events = parse_events(request.body)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    try:
+        results = ingest_checkins(events)
+    except TimeoutError as exc:
+        return JsonResponse({'error': str(exc)}, status=503)
+
+    return JsonResponse({
+        'summary': summarize(results),
+        'results': results,
+    })
+
+
 @login_required
 def self_manual_attendance(request):
     today = timezone.localdate()
 
     if request.method == "POST":
-        # Delete any duplicate attendance entries for today
-        Attendance.objects.filter(user=request.user, date=today).delete()
-
-        # Create fresh attendance
-        Attendance.objects.create(user=request.user, date=today, status="PRESENT")
+        mark_attendance_bulk([request.user.pk], today, "PRESENT")
 
         messages.success(request, "Your attendance has been marked successfully.")
         return redirect("attendance_history")
@@ -147,65 +369,201 @@ def self_manual_attendance(request):
     })
 
 
-@login_required
-def attendance_summary(request):
+@alogin_required
+@read_from_replica()
+async def attendance_summary(request):
     date_str = request.GET.get("date")
     if date_str:
-        date = timezone.datetime.strptime(date_str, "%Y-%m-%d").date()
+        try:
+            day = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            return HttpResponseBadRequest("date must be in YYYY-MM-DD format")
     else:
-        date = timezone.localdate()
+        day = timezone.localdate()
 
-    present_attendance = Attendance.objects.filter(date=date, status='PRESENT').select_related("user")
-    present_user_ids = present_attendance.values_list('user_id', flat=True)
+    summary = await aget_daily_summary(day)
+    show = "absent" if request.GET.get("show") == "absent" else "present"
+    bitmap = summary.absent_bitmap if show == "absent" else summary.present_bitmap
 
-    all_user_ids = User.objects.values_list("id", flat=True)
-    absent_users = User.objects.exclude(id__in=present_user_ids)
+    # Only the requested page of ids is resolved to usernames.
+    page = Paginator(bitmap_to_ids(bitmap), settings.ATTENDANCE_SUMMARY_PAGE_SIZE).get_page(request.GET.get("page"))
+    users = [user async for user in User.objects.filter(pk__in=page.object_list).only('username').order_by('username')]
 
     return render(request, "core/attendance_summary.html", {
-        "date": date,
-        "present_users": present_attendance,  # these are Attendance instances
-        "absent_users": absent_users,        # these are User instances
+        "date": day,
+        "summary": summary,
+        "show": show,
+        "page": page,
+        "users": users,
+        "live": day == timezone.localdate(),
     })
 
-@login_required
-def export_attendance_pdf(request):
-    today = date.today()
-    records = Attendance.objects.filter(date=today)
-
-    html_string = render_to_string('core/export_attendance_pdf.html', {
-        'records': records,
-        'date': today
-    })
-    html = HTML(string=html_string)
-    pdf_file = html.write_pdf()
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Attendance_{today}.pdf"'
+@alogin_required
+async def attendance_live(request):
+    # Server-Sent Events behind the live summary page (see core.live): the
+    # current counts, then a "counts" event on every change and a "checkin"
+    # event naming whoever just checked in.
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_live_events(timezone.localdate()), content_type='text/event-stream')
+    else:
+        # A WSGI worker can't be held open per dashboard, so send the counts
+        # and let the browser reconnect later, which turns it into a poll.
+        summary = await aget_daily_summary(timezone.localdate())
+        response = StreamingHttpResponse([
+            f"retry: {settings.LIVE_DASHBOARD_RESYNC_SECONDS * 1000}\n\n".encode(),
+            live.counts_message(summary),
+        ], content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass events straight through
     return response
 
 
+async def _live_events(day):
+    # Subscribed before the first read, so no change can fall in between;
+    # every message carries the stored totals, so a repeat is harmless.
+    subscription = live.broker.subscribe()
+    try:
+        event = live.RESYNC
+        while True:
+            if event is live.RESYNC:
+                summary = await aget_daily_summary(day)
+                # An idle stream shouldn't pin a database connection.
+                await sync_to_async(release_connections)()
+                yield live.counts_message(summary)
+            elif event.date == day:
+                yield event.message
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.LIVE_DASHBOARD_RESYNC_SECONDS)
+            except asyncio.TimeoutError:
+                event = live.RESYNC  # also keeps proxies from closing a quiet stream
+    finally:
+        live.broker.unsubscribe(subscription)
+
+
+def _start_pdf_export(request, kind, params=None):
+    job = ExportJob.objects.create(requested_by=request.user, kind=kind, params=params or {})
+    transaction.on_commit(lambda: generate_pdf_export.delay(job.pk))
+    return redirect('export_status', pk=job.pk)
+
+
+def _get_export_job(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.requested_by_id != request.user.id and not request.user.is_staff:
+        raise Http404
+    return job
+
+
+@login_required
+def export_attendance_pdf(request):
+    return _start_pdf_export(request, 'attendance', {'date': date.today().isoformat()})
+
+
+@login_required
 def export_leave_pdf(request):
-    leaves = LeaveRequest.objects.all()
-    html_string = render_to_string('core/export_leave_pdf.html', {
-        'leaves': leaves,
-    })
-    pdf_file = HTML(string=html_string).write_pdf()
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="Leave_Requests.pdf"'
-    return response
+    return _start_pdf_export(request, 'leave')
 
 
+@login_required
 def export_holiday_pdf(request):
-    holidays = Holiday.objects.all()
-    html_string = render_to_string('core/admin_export_pdf.html', {
-        'queryset': holidays,
-        'title': 'Holidays'
-    })
+    return _start_pdf_export(request, 'holiday')
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename=holidays.pdf'
-    HTML(string=html_string).write_pdf(response)
-    return response
+
+@login_required
+def export_status(request, pk):
+    job = _get_export_job(request, pk)
+    template = 'core/partials/export_status.html' if request.htmx else 'core/export_status.html'
+    return render(request, template, {'job': job})
+
+
+@login_required
+def export_download(request, pk):
+    job = _get_export_job(request, pk)
+    if job.status != 'DONE':
+        raise Http404
+    return FileResponse(
+        open(export_file_path(job), 'rb'),
+        as_attachment=True,
+        filename=report_filename(job.kind, job.params),
+        content_type='application/pdf',
+    )
+
+
+@staff_member_required
+def export_data(request, dataset, fmt):
+    if dataset not in DATASETS or fmt not in EXPORT_FORMATS:
+        raise Http404
+
+    month = request.GET.get("month")
+    if month:
+        try:
+            start = datetime.strptime(month, "%Y-%m").date()
+        except ValueError:
+            return HttpResponseBadRequest("month must be in YYYY-MM format")
+    else:
+        start = timezone.localdate().replace(day=1)
+    end = date(start.year, start.month, calendar.monthrange(start.year, start.month)[1])
+
+    # Rows are read while the response streams, after the view has returned,
+    # so the replica is picked here rather than by a decorator.
+    queryset = dataset_queryset(dataset, start, end).using(replica_alias())
+    filename = f"{dataset.title()}_{start:%Y-%m}"
+    return EXPORT_FORMATS[fmt](dataset, queryset, filename)
+
+
+def _report_range(request):
+    end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+    start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    if end < start:
+        raise ValueError("End date cannot be before start date")
+    return start, end
+
+
+@staff_member_required
+@read_from_replica()
+def attendance_analytics(request):
+    try:
+        start, end = _report_range(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date range")
+    report = analytics.attendance_report(start, end)
+    if request.GET.get('format') == 'xlsx':
+        return FileResponse(
+            analytics.report_xlsx(report),
+            as_attachment=True,
+            filename=f"Attendance_Analytics_{start}_{end}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    return JsonResponse(analytics.report_json(report))
+
+
+@staff_member_required
+@read_from_replica()
+def leave_balances_api(request):
+    # Payroll feed: every user's balances, computed from the ledger in one query.
+    return JsonResponse({'results': list(ledger_totals())})
+
+
+@staff_member_required
+def dashboard_cache_stats(request):
+    return JsonResponse(dashboard_cache.cache_stats())
+
+
+def prometheus_metrics(request):
+    authorization = request.headers.get('Authorization', '')
+    token_ok = bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+    )
+    if not token_ok and not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    stats = dashboard_cache.cache_stats()
+    extra = []
+    for outcome in ('hits', 'misses'):
+        extra.append(f"# TYPE dashboard_cache_{outcome}_total counter")
+        extra.extend(f'dashboard_cache_{outcome}_total{{namespace="{namespace}"}} {counts[outcome]}'
+                     for namespace, counts in stats.items())
+    return HttpResponse(profiling.metrics.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 def logout_view(request):
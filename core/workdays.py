@@ -0,0 +1,22 @@
+import numpy as np
+
+from .holidays import get_holiday_calendar
+
+
+def holiday_array(calendar=None):
+    calendar = calendar or get_holiday_calendar()
+    return np.array(calendar.dates, dtype='datetime64[D]')
+
+
+def working_days(starts, ends, holidays=None):
+    # Chargeable (Mon-Fri, non-holiday) days for each inclusive [start, end] pair,
+    # computed for the whole batch in one vectorized call.
+    if holidays is None:
+        holidays = holiday_array()
+    starts = np.asarray(starts, dtype='datetime64[D]')
+    ends = np.asarray(ends, dtype='datetime64[D]') + np.timedelta64(1, 'D')
+    return np.clip(np.busday_count(starts, ends, holidays=holidays), 0, None)
+
+
+def working_days_between(start, end):
+    return int(working_days([start], [end])[0])